@@ -0,0 +1,73 @@
+"""Generate synthetic inputs for benchmarks
+
+1D histograms filled with Poisson distributed counts are written to .npz archives and, if PyROOT
+is available, to ROOT files where they are stored in a TList at the bottom of nested directories.
+"""
+
+from os.path import join
+
+import numpy as np
+
+
+def has_root():
+    """Whether or not PyROOT can be used"""
+    try:
+        import ROOT # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        return False
+    return True
+
+def make_histograms(n_histograms, n_bins, seed=42):
+    """Bin centers and counts of synthetic histograms
+
+    Returns:
+        numpy.ndarray, numpy.ndarray: bin centers of shape (n_bins,) and counts of shape (n_histograms, n_bins)
+    """
+    rng = np.random.default_rng(seed)
+    x = (np.arange(n_bins) + 0.5) / n_bins
+    return x, rng.poisson(100, (n_histograms, n_bins)).astype(np.float64)
+
+def write_npz(directory, n_histograms, n_bins):
+    """Write histograms with their uncertainties to an uncompressed .npz archive
+
+    Returns:
+        str: path to the archive
+    """
+    x, counts = make_histograms(n_histograms, n_bins)
+    arrays = {}
+    for i, y in enumerate(counts):
+        arrays[f"h_{i}"] = np.column_stack((x, y))
+        arrays[f"h_{i}__errors"] = np.sqrt(y)[:,None]
+    filepath = join(directory, "histograms.npz")
+    np.savez(filepath, **arrays)
+    return filepath
+
+def write_root(directory, n_histograms, n_bins, depth=1):
+    """Write histograms to a ROOT file
+
+    Args:
+        depth: int
+            histograms are put into a TList inside depth - 1 nested directories
+    Returns:
+        str: path to the ROOT file
+    """
+    import ROOT # pylint: disable=import-outside-toplevel
+    ROOT.TH1.AddDirectory(False)
+    _, counts = make_histograms(n_histograms, n_bins)
+    filepath = join(directory, "histograms.root")
+    root_file = ROOT.TFile.Open(filepath, "RECREATE")
+    root_directory = root_file
+    for i in range(depth - 1):
+        root_directory = root_directory.mkdir(f"dir_{i}")
+    histograms = ROOT.TList()
+    histograms.SetOwner(True)
+    for i, y in enumerate(counts):
+        histogram = ROOT.TH1D(f"h_{i}", f"h_{i}", n_bins, 0., 1.)
+        # underflow and overflow are empty
+        histogram.Set(n_bins + 2, np.concatenate(([0.], y, [0.])))
+        histogram.SetEntries(y.sum())
+        histograms.Add(histogram)
+    root_directory.cd()
+    histograms.Write("histograms", ROOT.TObject.kSingleKey)
+    root_file.Close()
+    return filepath
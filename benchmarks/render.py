@@ -0,0 +1,66 @@
+"""Compare throughput of the render engines
+
+Plots synthetic 1D histograms with each engine and reports plots per second
+"""
+
+import sys
+import argparse
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from os.path import join
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+
+from fast_plotting.data import DataWrapper
+from fast_plotting.registry import add_to_registry, clear_registry
+from fast_plotting.plot import plot_single, finalise_figure, RENDER_ENGINES, RENDER_ENGINE_FAST, PLOT_TYPES
+
+
+def make_batches(n_plots, n_objects, n_bins, plot_type):
+    """Register synthetic data and return plot batches using it"""
+    clear_registry()
+    rng = np.random.default_rng(42)
+    x = np.linspace(0., 1., n_bins)
+    for i in range(n_objects):
+        y = rng.poisson(100, n_bins).astype(float)
+        uncertainties = np.zeros((n_bins, 2, 2))
+        uncertainties[:,1,:] = np.sqrt(y)[:,None]
+        add_to_registry(f"object_{i}", DataWrapper(f"object_{i}", np.column_stack((x, y)), uncertainties=uncertainties))
+    objects = [{"identifier": f"object_{i}", "type": plot_type, "label": f"object {i}"} for i in range(n_objects)]
+    return [{"objects": objects, "title": f"plot {i}", "output": f"plot_{i}.png"} for i in range(n_plots)]
+
+def run(n_plots, n_objects, n_bins, plot_type):
+    """Time all engines
+
+    Returns:
+        dict: plots per second by engine
+    """
+    batches = make_batches(n_plots, n_objects, n_bins, plot_type)
+    results = {}
+    with TemporaryDirectory() as out_dir:
+        for engine in RENDER_ENGINES:
+            start = perf_counter()
+            for b in batches:
+                b["engine"] = engine
+                figure, _ = plot_single(b)
+                finalise_figure(figure, join(out_dir, b["output"]), engine != RENDER_ENGINE_FAST)
+            results[engine] = n_plots / (perf_counter() - start)
+    return results
+
+def main():
+    """Print the throughput of each render engine"""
+    parser = argparse.ArgumentParser("Render engine benchmark")
+    parser.add_argument("--plots", type=int, default=10, help="number of plots")
+    parser.add_argument("--objects", type=int, default=3, help="number of objects per plot")
+    parser.add_argument("--bins", type=int, default=1000, help="number of bins per object")
+    parser.add_argument("--type", choices=PLOT_TYPES, default="step", help="plot type")
+    args = parser.parse_args()
+    results = run(args.plots, args.objects, args.bins, args.type)
+    for engine, throughput in results.items():
+        print(f"{engine:10} {throughput:8.2f} plots/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
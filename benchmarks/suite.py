@@ -0,0 +1,223 @@
+"""Benchmark suite for configuring and plotting
+
+Synthetic inputs are generated for every combination of the requested numbers of histograms,
+bins, directory depths (ROOT only) and overlay widths (histograms per plot). For each case and
+source (npz and, if available, ROOT) the stages
+
+    extract          discover everything in the input file
+    convert_to_numpy convert ROOT histograms (ROOT only)
+    read_from_config load all data needed by the plots
+    plot_single      render and save each plot, for every render engine
+    end_to_end       run.py plot in a separate process
+
+are timed. Each case runs in a fresh process so that its peak RSS is not inflated by earlier
+cases. Results including throughput and peak RSS are written as JSON. Pass a previous result
+with --compare to see relative changes of the throughput.
+"""
+
+import sys
+import json
+import argparse
+import platform
+import resource
+import subprocess
+from multiprocessing import get_context
+from itertools import product
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from os import environ, pathsep, wait4, waitstatus_to_exitcode
+from os.path import join, dirname, abspath
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+
+import fast_plotting
+from fast_plotting.config import configure_from_sources
+from fast_plotting.registry import read_from_config, clear_registry, close_sources
+from fast_plotting.cache import configure_cache
+from fast_plotting.plot import plot_single, finalise_figure, RENDER_ENGINES, RENDER_ENGINE_FAST
+
+from generate import has_root, write_npz, write_root
+
+
+def peak_rss_mb(usage=None):
+    """Peak resident set size in MB
+
+    Args:
+        usage: resource.struct_rusage (optional)
+            usage of a child process, this process if None
+    Note:
+        The peak covers the lifetime of the process and a new process starts with the peak of its
+        parent, hence cases are measured in fresh processes started from the small main process.
+    """
+    usage = usage or resource.getrusage(resource.RUSAGE_SELF)
+    # kB on Linux
+    return usage.ru_maxrss / 1024
+
+def add_overlay_plots(config, overlay):
+    """Put overlay histograms into each plot"""
+    identifiers = [s["identifier"] for s in config.get_sources()]
+    for i in range(0, len(identifiers), overlay):
+        objects = [{"identifier": identifier, "type": "step", "label": identifier} for identifier in identifiers[i:i + overlay]]
+        config.add_plot(identifier=f"plot_{i}", objects=objects, title=f"plot {i}", enable=True, output=f"plot_{i}.png")
+
+def time_convert_to_numpy(filepath, config):
+    """Convert all ROOT histograms of a file"""
+    # pylint: disable=import-outside-toplevel
+    from fast_plotting.sources.root import get_object, convert_to_numpy
+    histograms = [get_object(filepath, s["rootpath"]) for s in config.get_sources()]
+    start = perf_counter()
+    for histogram in histograms:
+        convert_to_numpy(histogram)
+    return perf_counter() - start
+
+def time_plot_single(config, out_dir):
+    """Render all plots with each engine
+
+    Returns:
+        dict: seconds per engine
+    """
+    seconds = {}
+    batches = [b for b in config.get_plots() if b["enable"]]
+    for engine in RENDER_ENGINES:
+        start = perf_counter()
+        for b in batches:
+            figure, _ = plot_single({**b, "engine": engine})
+            finalise_figure(figure, join(out_dir, b["output"]), engine != RENDER_ENGINE_FAST)
+        seconds[engine] = perf_counter() - start
+    return seconds
+
+def time_end_to_end(config_path, directory):
+    """Plot everything from a configuration in a new process
+
+    Returns:
+        float, float: seconds and peak RSS of that process in MB
+    """
+    run_path = join(dirname(abspath(fast_plotting.__file__)), "run.py")
+    package_dir = dirname(dirname(abspath(fast_plotting.__file__)))
+    env = dict(environ, PYTHONPATH=pathsep.join(p for p in (package_dir, environ.get("PYTHONPATH")) if p), MPLBACKEND="Agg")
+    command = [sys.executable, run_path, "plot", "-c", config_path, "-o", join(directory, "end_to_end"), "--force", "--no-cache"]
+    start = perf_counter()
+    # reaped by wait4 below which also gives the usage of exactly this process, not the maximum over all children so far
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) # pylint: disable=consider-using-with
+    _, status, usage = wait4(process.pid, 0)
+    seconds = perf_counter() - start
+    if waitstatus_to_exitcode(status):
+        raise subprocess.CalledProcessError(waitstatus_to_exitcode(status), command)
+    return seconds, peak_rss_mb(usage)
+
+def run_case(directory, source, n_histograms, n_bins, depth, overlay):
+    """Run all in-process stages for one case
+
+    The configuration is written to config.json in the directory for the end-to-end stage.
+
+    Returns:
+        dict: parameters and results of each stage
+    """
+    clear_registry()
+    close_sources()
+    n_total_bins = n_histograms * n_bins
+    stages = {}
+    if source == "root":
+        filepath = write_root(directory, n_histograms, n_bins, depth)
+    else:
+        filepath = write_npz(directory, n_histograms, n_bins)
+
+    start = perf_counter()
+    config = configure_from_sources([filepath])
+    seconds = perf_counter() - start
+    stages["extract"] = {"seconds": seconds, "histograms_per_s": n_histograms / seconds}
+    add_overlay_plots(config, overlay)
+    n_plots = len(config.get_plots())
+
+    if source == "root":
+        seconds = time_convert_to_numpy(filepath, config)
+        stages["convert_to_numpy"] = {"seconds": seconds, "bins_per_s": n_total_bins / seconds}
+        close_sources()
+
+    start = perf_counter()
+    read_from_config(config)
+    seconds = perf_counter() - start
+    stages["read_from_config"] = {"seconds": seconds, "histograms_per_s": n_histograms / seconds,
+                                  "bins_per_s": n_total_bins / seconds}
+
+    for engine, seconds in time_plot_single(config, directory).items():
+        stages[f"plot_single_{engine}"] = {"seconds": seconds, "plots_per_s": n_plots / seconds,
+                                           "bins_per_s": n_total_bins / seconds}
+    config.write(join(directory, "config.json"))
+
+    return {"source": source, "histograms": n_histograms, "bins": n_bins, "depth": depth, "overlay": overlay,
+            "plots": n_plots, "stages": stages, "peak_rss_mb": peak_rss_mb()}
+
+def run_case_in_process(*args):
+    """Run all stages of a case, see run_case for the arguments
+
+    The in-process stages run in a fresh process whose peak RSS only covers this case, the
+    end-to-end stage is started from here so that it does not start with that peak either.
+    """
+    with TemporaryDirectory() as directory:
+        with get_context("spawn").Pool(1) as pool:
+            case = pool.apply(run_case, (directory, *args))
+        seconds, peak = time_end_to_end(join(directory, "config.json"), directory)
+    case["stages"]["end_to_end"] = {"seconds": seconds, "plots_per_s": case["plots"] / seconds, "peak_rss_mb": peak}
+    return case
+
+def case_key(case):
+    """Identify a case independent of its results"""
+    return tuple(case[k] for k in ("source", "histograms", "bins", "depth", "overlay"))
+
+def compare(results, baseline):
+    """Print relative changes of throughput compared to a baseline"""
+    baseline_cases = {case_key(c): c for c in baseline["cases"]}
+    for case in results["cases"]:
+        reference = baseline_cases.get(case_key(case))
+        if not reference:
+            continue
+        for stage, values in case["stages"].items():
+            for metric, value in values.items():
+                reference_value = reference["stages"].get(stage, {}).get(metric)
+                if not metric.endswith("_per_s") or not reference_value:
+                    continue
+                print(f"{str(case_key(case)):40} {stage:25} {metric:18} {value / reference_value - 1:+8.1%}")
+
+def main():
+    """Run all requested cases and write or compare the results"""
+    parser = argparse.ArgumentParser("Benchmark suite")
+    parser.add_argument("--histograms", type=int, nargs="+", default=[10, 100], help="numbers of histograms per file")
+    parser.add_argument("--bins", type=int, nargs="+", default=[100, 10000], help="numbers of bins per histogram")
+    parser.add_argument("--depth", type=int, nargs="+", default=[1, 3], help="directory depths (ROOT only)")
+    parser.add_argument("--overlay", type=int, nargs="+", default=[1, 5], help="numbers of histograms per plot")
+    parser.add_argument("--sources", nargs="+", choices=("npz", "root"), default=["npz", "root"],
+                        help="sources to benchmark, root is skipped if PyROOT is not available")
+    parser.add_argument("-o", "--output", help="where to write the results as JSON, printed if not given")
+    parser.add_argument("--compare", help="results of a previous run to compare to")
+    args = parser.parse_args()
+
+    # always measure the conversion
+    configure_cache(False)
+
+    sources = [s for s in args.sources if s != "root" or has_root()]
+    cases = []
+    for source, n_histograms, n_bins, depth, overlay in product(sources, args.histograms, args.bins, args.depth, args.overlay):
+        if source != "root" and depth != args.depth[0]:
+            # depth does not matter for flat archives
+            continue
+        cases.append(run_case_in_process(source, n_histograms, n_bins, depth, overlay))
+
+    results = {"environment": {"python": platform.python_version(), "numpy": np.__version__,
+                               "matplotlib": matplotlib.__version__, "fast_plotting": fast_plotting.__version__,
+                               "root": has_root()},
+               "cases": cases}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
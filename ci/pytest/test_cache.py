@@ -0,0 +1,65 @@
+"""On-disk cache of converted data"""
+
+from os import utime, listdir
+from os.path import join
+
+import numpy as np
+import pytest
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.cache import CACHE_SETTINGS, configure_cache, load_from_cache, save_to_cache, cache_key, get_cache_dir
+
+
+@pytest.fixture(name="cache_dir")
+def fixture_cache_dir(tmp_path):
+    """Use a fresh cache and restore the settings afterwards"""
+    settings = dict(CACHE_SETTINGS)
+    configure_cache(True, join(tmp_path, "cache"))
+    yield get_cache_dir()
+    CACHE_SETTINGS.update(settings)
+
+def make_source(tmp_path, name):
+    filepath = join(tmp_path, f"{name}.root")
+    with open(filepath, "wb") as f:
+        f.write(b"0" * 100)
+    return {"source_name": "root", "identifier": name, "filepath": filepath, "rootpath": name}
+
+def make_data_wrapper(name, n=10):
+    return DataWrapper(name, np.arange(2. * n).reshape(n, 2), uncertainties=np.ones((n, 2, 2)), symmetric=False,
+                       error_axes=[1], data_annotations=DataAnnotations(axis_labels=["x", "y"]))
+
+def test_round_trip(tmp_path, cache_dir):
+    batch = make_source(tmp_path, "h")
+    assert load_from_cache(batch) is None
+    data_wrapper = make_data_wrapper("h")
+    save_to_cache(batch, data_wrapper)
+    cached = load_from_cache(batch)
+    assert isinstance(cached.data, np.memmap)
+    assert np.array_equal(cached.data, data_wrapper.data)
+    assert np.array_equal(cached.errors, data_wrapper.errors)
+    assert not cached.symmetric and list(cached.error_axes) == [1]
+    assert list(cached.data_annotations.axis_labels) == ["x", "y"]
+    # the identifier does not matter
+    assert load_from_cache({**batch, "identifier": "other"}) is not None
+    assert listdir(cache_dir) == [cache_key(batch)]
+
+def test_stale(tmp_path, cache_dir): # pylint: disable=unused-argument
+    """Entries are not used anymore once the source file changes"""
+    batch = make_source(tmp_path, "h")
+    save_to_cache(batch, make_data_wrapper("h"))
+    utime(batch["filepath"], ns=(1, 1))
+    assert load_from_cache(batch) is None
+
+def test_evict(tmp_path, cache_dir):
+    """Least recently used entries are evicted beyond the maximum size"""
+    batches = [make_source(tmp_path, f"h{i}") for i in range(3)]
+    save_to_cache(batches[0], make_data_wrapper("h0"))
+    entry_size = CACHE_SETTINGS["size"]
+    configure_cache(True, max_size=2 * entry_size)
+    save_to_cache(batches[1], make_data_wrapper("h1"))
+    # h0 is used more recently than h1
+    utime(join(cache_dir, cache_key(batches[1])), ns=(1, 1))
+    save_to_cache(batches[2], make_data_wrapper("h2"))
+    assert load_from_cache(batches[1]) is None
+    assert load_from_cache(batches[0]) is not None and load_from_cache(batches[2]) is not None
+    assert CACHE_SETTINGS["size"] == 2 * entry_size
@@ -0,0 +1,138 @@
+"""Building and selecting from configurations"""
+
+from os import stat
+from os.path import join
+
+import numpy as np
+import pytest
+
+from fast_plotting import config as config_module
+from fast_plotting.io import dump_config
+from fast_plotting.manifest import read_manifest
+from fast_plotting.plot import plot_incremental
+from fast_plotting.registry import clear_registry, close_sources
+from fast_plotting.config import ConfigInterface, configure_from_sources, read_config, add_plot_for_each_source, add_overlay_plot_for_sources
+
+
+def getmtime_ns(path):
+    return stat(path).st_mtime_ns
+
+def make_config(*plot_identifiers):
+    config = ConfigInterface()
+    for identifier in plot_identifiers:
+        config.add_plot(identifier=identifier, objects=[], output=f"{identifier}.png")
+    return config
+
+def enabled(config):
+    return {p["identifier"] for p in config.get_plots() if p["enable"]}
+
+def test_select_exact_before_pattern():
+    """Identifiers looking like glob patterns are taken literally if such a plot exists"""
+    config = make_config("hPt[0]", "hPt0", "hPt1", "hEta")
+    config.enable_plots("hPt[0]")
+    assert enabled(config) == {"hPt[0]"}
+    config.enable_plots("hPt[01]")
+    assert enabled(config) == {"hPt0", "hPt1"}
+    config.enable_plots("hPt*")
+    assert enabled(config) == {"hPt[0]", "hPt0", "hPt1"}
+    config.enable_plots("re:h(Eta|Pt1)")
+    assert enabled(config) == {"hEta", "hPt1"}
+
+def test_duplicates_keep_first(tmp_path):
+    """Duplicates are dropped with a warning instead of aborting"""
+    config = make_config("a", "b")
+    config.add_plot(identifier="a", objects=[], output="other.png")
+    config.add_data_source("npz", "s", key="first")
+    config.add_data_source("npz", "s", key="second")
+    assert [p["output"] for p in config.get_plots()] == ["a.png", "b.png"]
+    assert config.get_source("s")["key"] == "first" and len(config.get_sources()) == 1
+
+    path = join(tmp_path, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"sources": [], "plots": [{"identifier": "a", "objects": [], "output": "a.png"},'
+                '{"identifier": "a", "objects": [], "output": "other.png"}]}')
+    assert [p["output"] for p in read_config(path).get_plots()] == ["a.png"]
+
+def test_generated_identifiers_unique():
+    """Single and overlay plots of sources h and h_0 do not collide"""
+    config = ConfigInterface()
+    for identifier in ("h", "h_0"):
+        config.add_data_source("npz", identifier)
+    add_plot_for_each_source(config)
+    add_overlay_plot_for_sources(config)
+    identifiers = [p["identifier"] for p in config.get_plots()]
+    outputs = [p["output"] for p in config.get_plots()]
+    assert len(identifiers) == 4 and len(set(identifiers)) == 4 and len(set(outputs)) == 4
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_unreadable_sources_reported(tmp_path, monkeypatch, jobs):
+    """Files which cannot be read are reported and skipped, also when read in parallel"""
+    errors = []
+    monkeypatch.setattr(config_module.CONFIG_LOGGER, "error", lambda msg, *args: errors.append(msg % args))
+    good = join(tmp_path, "good.npz")
+    np.savez(good, h=np.zeros((3, 2)))
+    missing = join(tmp_path, "missing.npz")
+    config = configure_from_sources([good, missing], jobs=jobs)
+    assert [s["identifier"] for s in config.get_sources()] == ["h_0"]
+    assert any(e.startswith(f"Cannot read {missing}: FileNotFoundError") for e in errors)
+
+@pytest.mark.parametrize("extension", [".json", ".jsonl", ".msgpack"])
+def test_formats_round_trip(tmp_path, extension):
+    """All formats give back the same configuration, duplicates are dropped when reading"""
+    if extension == ".msgpack":
+        pytest.importorskip("msgpack")
+    config = make_config("a", "b")
+    config.add_data_source("npz", "s", filepath="data.npz", key="s")
+    path = join(tmp_path, f"config{extension}")
+    config.write(path)
+    assert read_config(path).get_sources() == config.get_sources()
+    assert read_config(path).get_plots() == config.get_plots()
+
+    plots = config.get_plots()
+    dump_config({"sources": config.get_sources() * 2, "plots": plots + [{**plots[0], "output": "other.png"}]}, path)
+    read_back = read_config(path)
+    assert read_back.get_sources() == config.get_sources()
+    assert read_back.get_plots() == plots
+
+@pytest.mark.parametrize("extension", [".jsonl", ".msgpack"])
+def test_iter_read_incremental(tmp_path, extension):
+    """Plots are yielded while the rest of the configuration has not been read yet"""
+    if extension == ".msgpack":
+        pytest.importorskip("msgpack")
+    path = join(tmp_path, f"config{extension}")
+    make_config("a", "b", "c").write(path)
+    config = ConfigInterface()
+    records = config.iter_read(path)
+    assert next(records)["identifier"] == "a"
+    assert [p["identifier"] for p in config.get_plots()] == ["a"]
+    assert [p["identifier"] for p in records] == ["b", "c"]
+    assert len(config.get_plots()) == 3
+
+def test_plot_incremental(tmp_path):
+    """Plots are rendered from a JSON Lines configuration and skipped when unchanged"""
+    x = np.linspace(0., 1., 20)
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, h=np.column_stack((x, x)), g=np.column_stack((x, x**2)))
+    config = configure_from_sources([npz_path])
+    add_plot_for_each_source(config)
+    config.enable_plots("all")
+    path = join(tmp_path, "config.jsonl")
+    config.write(path)
+    out_dir = join(tmp_path, "plots")
+    outputs = [p["output"] for p in config.get_plots()]
+    try:
+        assert not plot_incremental(ConfigInterface(), path, out_dir)
+        manifest = read_manifest(out_dir)
+        assert sorted(manifest) == sorted(outputs)
+        stamps = {o: getmtime_ns(join(out_dir, o)) for o in outputs}
+
+        config.get_plots()[0]["title"] = "changed"
+        config.write(path)
+        clear_registry()
+        assert not plot_incremental(ConfigInterface(), path, out_dir)
+        assert getmtime_ns(join(out_dir, outputs[0])) != stamps[outputs[0]]
+        assert getmtime_ns(join(out_dir, outputs[1])) == stamps[outputs[1]]
+        assert read_manifest(out_dir)[outputs[1]] == manifest[outputs[1]]
+    finally:
+        clear_registry()
+        close_sources()
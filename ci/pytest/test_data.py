@@ -0,0 +1,64 @@
+"""Compactly stored uncertainties of DataWrapper"""
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper
+
+
+N = 5
+
+def make_data():
+    x = np.arange(N, dtype=float)
+    return np.column_stack((x, x**2))
+
+def test_no_errors():
+    wrapper = DataWrapper("d", make_data())
+    assert wrapper.get_errors(0) is None and wrapper.get_errors(1) is None
+    assert wrapper.uncertainties.shape == (N, 2, 2) and not wrapper.uncertainties.any()
+    assert wrapper.nbytes == wrapper.data.nbytes
+
+def test_legacy_layout():
+    """Uncertainties of shape (n, dim, 2) are taken as they are"""
+    uncertainties = np.random.default_rng(1).random((N, 2, 2))
+    wrapper = DataWrapper("d", make_data(), uncertainties=uncertainties)
+    assert wrapper.uncertainties is uncertainties
+    assert wrapper.get_errors(0).shape == (2, N)
+    np.testing.assert_array_equal(wrapper.get_errors(1), uncertainties[:,1,:].T)
+
+def test_symmetric():
+    """One value per point and axis is expanded to lower and upper uncertainties"""
+    errors = np.sqrt(make_data())
+    wrapper = DataWrapper("d", make_data(), uncertainties=errors, symmetric=True)
+    assert wrapper.get_errors(1).shape == (N,)
+    np.testing.assert_array_equal(wrapper.get_errors(0), errors[:,0])
+    for side in range(2):
+        np.testing.assert_array_equal(wrapper.uncertainties[:,:,side], errors)
+
+def test_partial_axes():
+    """Uncertainties of some axes only, the others are zero"""
+    y_errors = np.sqrt(make_data()[:,1:])
+    wrapper = DataWrapper("d", make_data(), uncertainties=y_errors, symmetric=True, error_axes=[1])
+    assert wrapper.get_errors(0) is None
+    np.testing.assert_array_equal(wrapper.get_errors(1), y_errors[:,0])
+    uncertainties = wrapper.uncertainties
+    assert uncertainties.shape == (N, 2, 2)
+    assert not uncertainties[:,0,:].any()
+    np.testing.assert_array_equal(uncertainties[:,1,1], y_errors[:,0])
+
+    lower_upper = np.stack((y_errors, 2 * y_errors), axis=-1)
+    wrapper = DataWrapper("d", make_data(), uncertainties=lower_upper, error_axes=[1])
+    assert wrapper.get_errors(1).shape == (2, N)
+    np.testing.assert_array_equal(wrapper.uncertainties[:,1,:], lower_upper[:,0,:])
+    assert not wrapper.uncertainties[:,0,:].any()
+
+def test_memory():
+    """The compact layout and a smaller type take less memory than the full one"""
+    data = make_data()
+    full = DataWrapper("d", data, uncertainties=np.zeros((N, 2, 2)))
+    compact = DataWrapper("d", data, uncertainties=np.sqrt(data[:,1:]), symmetric=True, error_axes=[1])
+    small = DataWrapper("d", data, uncertainties=np.sqrt(data[:,1:]), symmetric=True, error_axes=[1], dtype="float32")
+    assert small.data.dtype == np.float32 and small.errors.dtype == np.float32
+    assert small.uncertainties.dtype == np.float32
+    assert full.nbytes == 6 * N * 8
+    assert compact.nbytes == 3 * N * 8
+    assert small.nbytes == compact.nbytes // 2
@@ -0,0 +1,63 @@
+"""Downsampling keeps what can be seen"""
+
+import numpy as np
+
+from fast_plotting.downsample import downsample
+
+
+def make_series(n=1000):
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 50.)
+    # a single sharp peak and dip which must survive
+    y[333] = 10.
+    y[666] = -10.
+    return x, y
+
+def test_peaks_preserved():
+    """Lines and steps keep minimum and maximum per bucket"""
+    x, y = make_series()
+    for plot_type in ("step", "line"):
+        x_down, y_down, _, _ = downsample(x, y, plot_type, 50)
+        assert len(x_down) <= 100
+        assert y_down.max() == 10. and y_down.min() == -10.
+        assert np.all(np.diff(x_down) > 0)
+        # points are taken as they are
+        assert np.array_equal(y[x_down.astype(int)], y_down)
+
+def test_nan():
+    """NaN neither wins against numbers nor breaks buckets which are NaN only"""
+    x, y = make_series()
+    y[::7] = np.nan
+    y[100:200] = np.nan
+    x_down, y_down, _, _ = downsample(x, y, "step", 50)
+    assert not np.any(np.isnan(y_down))
+    assert not np.any((x_down >= 100) & (x_down < 200))
+    assert y_down.max() == 10. and y_down.min() == -10.
+
+def test_error_shapes():
+    """Symmetric (n,) and asymmetric (2, n) uncertainties follow the points"""
+    x, y = make_series()
+    yerr = np.abs(y) / 10.
+    xerr = np.full((2, len(x)), 0.5)
+    for plot_type in ("step", "line", "bar"):
+        x_down, y_down, xerr_down, yerr_down = downsample(x, y, plot_type, 50, xerr, yerr)
+        assert xerr_down.shape == (2, len(x_down))
+        assert yerr_down.shape == y_down.shape
+        assert downsample(x, y, plot_type, 50)[2:] == (None, None)
+
+def test_bar_rebinned():
+    """Bars become the means of buckets with uncertainties of the means"""
+    x = np.arange(100, dtype=float)
+    y = np.ones(100)
+    yerr = np.ones(100)
+    x_down, y_down, _, yerr_down = downsample(x, y, "bar", 10, yerr=yerr)
+    assert np.allclose(x_down, np.arange(4.5, 100., 10.))
+    assert np.allclose(y_down, 1.)
+    assert np.allclose(yerr_down, 1. / np.sqrt(10.))
+
+def test_scatter_untouched():
+    """Every marker of a scatter plot is kept"""
+    x, y = make_series()
+    yerr = np.abs(y) / 10.
+    x_down, y_down, xerr_down, yerr_down = downsample(x, y, "scatter", 50, yerr=yerr)
+    assert x_down is x and y_down is y and xerr_down is None and yerr_down is yerr
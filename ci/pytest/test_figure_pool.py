@@ -0,0 +1,37 @@
+"""Recycling figures and their layout"""
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+
+from fast_plotting import figure_pool
+from fast_plotting.figure_pool import FigurePool
+
+
+def draw(pool, y, title="title"):
+    ax = pool.get_axes((4, 3))
+    ax.plot(np.arange(len(y)), y)
+    ax.set_title(title)
+    figure = ax.get_figure()
+    pool.layout(figure)
+    params = dict(vars(figure.subplotpars))
+    pool.release(figure)
+    return params
+
+def test_layout_shared_by_same_labels():
+    """Different data with the same tick labels reuses the layout, different labels do not"""
+    pool = FigurePool()
+    params = draw(pool, [0., 0.93, 0.41])
+    assert draw(pool, [0.01, 0.92, 0.4]) == params
+    assert len(pool.layouts) == 1
+    draw(pool, [0., 1000000., 3.])
+    assert len(pool.layouts) == 2
+    pool.close()
+
+def test_layout_cache_bounded(monkeypatch):
+    monkeypatch.setattr(figure_pool, "MAX_CACHED_LAYOUTS", 3)
+    pool = FigurePool()
+    for i in range(5):
+        draw(pool, [0., 1.], title=f"plot {i}")
+    assert len(pool.layouts) == 3
+    pool.close()
@@ -0,0 +1,76 @@
+"""Plots are rendered again when anything they depend on changes"""
+
+from os.path import join, isfile
+
+import numpy as np
+
+from fast_plotting import registry
+from fast_plotting.config import configure_from_sources, add_plot_for_each_source
+from fast_plotting.registry import clear_registry, close_sources
+from fast_plotting.manifest import read_manifest
+from fast_plotting.plot import plot, configure_rendering, RENDER_SETTINGS
+
+
+def test_render_settings_invalidate(tmp_path):
+    """Changing any global render setting renders again, nothing else does"""
+    x = np.linspace(0., 1., 50)
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, h=np.column_stack((x, x**2)))
+    config = configure_from_sources([npz_path], ["data"])
+    add_plot_for_each_source(config)
+    config.enable_plots("all")
+    output = config.get_plots()[0]["output"]
+    out_dir = join(tmp_path, "plots")
+    default_settings = dict(RENDER_SETTINGS)
+    try:
+        # keep images small
+        configure_rendering(dpi=10)
+        assert not plot(config, out_dir)
+        manifest = read_manifest(out_dir)
+        assert not plot(config, out_dir)
+        assert read_manifest(out_dir) == manifest
+        for setting in ({"engine": "fast"}, {"downsample_threshold": 5}, {"dpi": 12}, {"compress_level": 1}):
+            configure_rendering(**setting)
+            assert not plot(config, out_dir)
+            assert read_manifest(out_dir)[output] != manifest[output], setting
+            manifest = read_manifest(out_dir)
+        configure_rendering(format="svg")
+        assert not plot(config, out_dir)
+        assert isfile(join(out_dir, output.replace(".png", ".svg")))
+    finally:
+        RENDER_SETTINGS.clear()
+        RENDER_SETTINGS.update(default_settings)
+        clear_registry()
+        close_sources()
+
+def test_unchanged_not_loaded(tmp_path, monkeypatch):
+    """Data is only converted for plots which are rendered"""
+    x = np.linspace(0., 1., 50)
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, h=np.column_stack((x, x**2)), g=np.column_stack((x, x**3)))
+    config = configure_from_sources([npz_path], ["data"])
+    add_plot_for_each_source(config)
+    config.enable_plots("all")
+    out_dir = join(tmp_path, "plots")
+    converted = []
+    convert_sources = registry.convert_sources
+
+    def recording_convert_sources(batches):
+        converted.extend(batches)
+        return convert_sources(batches)
+
+    monkeypatch.setattr(registry, "convert_sources", recording_convert_sources)
+    try:
+        assert not plot(config, out_dir)
+        assert len(converted) == 2
+        clear_registry()
+        converted.clear()
+        assert not plot(config, out_dir)
+        assert not converted
+        config.get_plots()[0]["title"] = "changed"
+        clear_registry()
+        assert not plot(config, out_dir)
+        assert [b["identifier"] for b in converted] == [o["identifier"] for o in config.get_plots()[0]["objects"]]
+    finally:
+        clear_registry()
+        close_sources()
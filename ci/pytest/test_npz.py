@@ -0,0 +1,90 @@
+"""Members of .npz archives are read correctly, without copying where possible"""
+
+from os.path import join
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper
+from fast_plotting.sources import npz
+
+
+ARRAYS = {"a": np.arange(20.).reshape(10, 2),
+          "b": np.asfortranarray(np.arange(30, dtype=np.int32).reshape(10, 3)),
+          "c": np.linspace(0., 1., 7),
+          "empty": np.zeros((0, 2))}
+
+
+class Unseekable:
+    """Writing to this makes zipfile use data descriptors"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+    def tell(self):
+        raise OSError("not seekable")
+
+def check(filepath, zero_copy):
+    npz.close_files()
+    for key, array in ARRAYS.items():
+        loaded = npz.load(filepath, key)
+        with np.load(filepath) as reference:
+            assert np.array_equal(loaded, reference[key]) and loaded.dtype == array.dtype
+        assert np.array_equal(loaded, array)
+        if zero_copy and array.size:
+            assert np.shares_memory(loaded, npz.NPZ_FILES[filepath][0])
+
+def test_stored(tmp_path):
+    filepath = join(tmp_path, "stored.npz")
+    np.savez(filepath, **ARRAYS)
+    check(filepath, True)
+
+def test_compressed(tmp_path):
+    filepath = join(tmp_path, "compressed.npz")
+    np.savez_compressed(filepath, **ARRAYS)
+    check(filepath, False)
+
+def test_zip64(tmp_path):
+    """Written by npz.write which forces zip64 extra fields"""
+    filepath = join(tmp_path, "zip64.npz")
+    npz.write(filepath, (DataWrapper(key, array if array.ndim == 2 else array[:,None]) for key, array in ARRAYS.items()))
+    npz.close_files()
+    for key, array in ARRAYS.items():
+        loaded = npz.load(filepath, key)
+        assert np.array_equal(loaded.reshape(array.shape), array)
+        with np.load(filepath) as reference:
+            assert np.array_equal(loaded, reference[key])
+    assert np.shares_memory(npz.load(filepath, "a"), npz.NPZ_FILES[filepath][0])
+
+def test_extra_fields_and_descriptors(tmp_path):
+    """Local headers with extra fields and members followed by data descriptors"""
+    filepath = join(tmp_path, "special.npz")
+    with open(filepath, "wb") as f:
+        with ZipFile(Unseekable(f), "w", ZIP_STORED) as zip_file:
+            for i, (key, array) in enumerate(ARRAYS.items()):
+                info = ZipInfo(f"{key}.npy")
+                # unknown extra field of varying length
+                info.extra = b"\xfe\xca" + (4 * i).to_bytes(2, "little") + b"x" * (4 * i)
+                with zip_file.open(info, "w") as member:
+                    np.lib.format.write_array(member, array)
+    with ZipFile(filepath) as zip_file:
+        assert all(info.flag_bits & 0x8 for info in zip_file.infolist())
+    check(filepath, True)
+
+def test_1d_errors(tmp_path):
+    """Uncertainties of 1D values are symmetric uncertainties along y"""
+    filepath = join(tmp_path, "values.npz")
+    y = np.arange(1., 11.)
+    np.savez(filepath, h=y, h__errors=np.sqrt(y))
+    npz.close_files()
+    batch, = npz.discover(filepath)
+    data_wrapper = npz.read(batch)
+    assert np.array_equal(data_wrapper.data[:,1], y)
+    assert data_wrapper.get_errors(0) is None
+    assert np.array_equal(data_wrapper.get_errors(1), np.sqrt(y))
@@ -0,0 +1,96 @@
+"""Plotting in parallel, streaming or prefetching gives the same as plotting serially"""
+
+from os import listdir
+from os.path import join, isfile
+
+import numpy as np
+import pytest
+
+from fast_plotting.config import configure_from_sources, add_plot_for_each_source
+from fast_plotting.registry import clear_registry, close_sources, count_references, DATA_REGISTRY
+from fast_plotting.plot import plot, configure_rendering, DataStreamer, RENDER_SETTINGS
+
+
+@pytest.fixture(name="config")
+def fixture_config(tmp_path):
+    """A few single plots and one overlay sharing their data, rendered small"""
+    x = np.linspace(0., 1., 50)
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, **{f"h{i}": np.column_stack((x, x**i)) for i in range(3)})
+    config = configure_from_sources([npz_path], ["data"])
+    add_plot_for_each_source(config)
+    config.add_plot(identifier="overlay", output="overlay.png",
+                    objects=[{"identifier": s["identifier"], "type": "step", "label": s["identifier"]} for s in config.get_sources()])
+    config.enable_plots("all")
+    default_settings = dict(RENDER_SETTINGS)
+    configure_rendering(dpi=10)
+    yield config
+    RENDER_SETTINGS.clear()
+    RENDER_SETTINGS.update(default_settings)
+    clear_registry()
+    close_sources()
+
+def read_outputs(out_dir):
+    """Images in a directory by name"""
+    outputs = {}
+    for name in listdir(out_dir):
+        if name.endswith(".png"):
+            with open(join(out_dir, name), "rb") as f:
+                outputs[name] = f.read()
+    return outputs
+
+def plot_fresh(config, out_dir, **kwargs):
+    """Plot with nothing loaded yet"""
+    clear_registry()
+    failed = plot(config, out_dir, **kwargs)
+    return failed, read_outputs(out_dir)
+
+def test_parallel(config, tmp_path):
+    """Workers write the same images, a failing plot is reported and does not stop the others"""
+    failed, serial = plot_fresh(config, join(tmp_path, "serial"))
+    assert not failed and len(serial) == 4
+    failed, parallel = plot_fresh(config, join(tmp_path, "parallel"), jobs=2)
+    assert not failed and parallel == serial
+
+    # mathtext cannot be parsed when drawing
+    config.get_plots()[0]["xlabel"] = r"$\frac{$"
+    out_dir = join(tmp_path, "broken")
+    failed, _ = plot_fresh(config, out_dir, jobs=2)
+    assert failed == [join(out_dir, config.get_plots()[0]["output"])]
+    assert all(isfile(join(out_dir, p["output"])) for p in config.get_plots()[1:])
+
+def test_stream(config, tmp_path):
+    """Data is released after the last batch using it, images are the same as when loading everything"""
+    batches = config.get_plots()
+    streamer = DataStreamer(config, batches)
+    remaining = count_references(batches)
+    for b in batches:
+        streamer.acquire(b)
+        assert all(o["identifier"] in DATA_REGISTRY.data for o in b["objects"])
+        streamer.release(b)
+        for o in b["objects"]:
+            remaining[o["identifier"]] -= 1
+        # everything still needed later is kept, nothing else
+        assert {o["identifier"] for o in b["objects"] if remaining[o["identifier"]]} <= set(DATA_REGISTRY.data)
+        assert set(DATA_REGISTRY.data) <= {i for i, n in remaining.items() if n}
+
+    failed, eager = plot_fresh(config, join(tmp_path, "eager"))
+    assert not failed and len(eager) == 4
+    failed, streamed = plot_fresh(config, join(tmp_path, "stream"), stream=True)
+    assert not failed and streamed == eager
+    assert not DATA_REGISTRY.data
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_prefetch(config, tmp_path, stream):
+    """Loading and writing in the background give the same images as --prefetch, failed writes are reported"""
+    failed, serial = plot_fresh(config, join(tmp_path, "serial"))
+    assert not failed and len(serial) == 4
+    failed, prefetched = plot_fresh(config, join(tmp_path, "prefetch"), stream=stream, prefetch_window=2, lazy=True)
+    assert not failed and prefetched == serial
+
+    # the directory does not exist, so only writing fails
+    config.get_plots()[0]["output"] = join("missing", "h.png")
+    out_dir = join(tmp_path, "broken")
+    failed, _ = plot_fresh(config, out_dir, stream=stream, prefetch_window=2, lazy=True)
+    assert failed == [join(out_dir, "missing", "h.png")]
+    assert all(isfile(join(out_dir, p["output"])) for p in config.get_plots()[1:])
@@ -0,0 +1,72 @@
+"""Loading, evicting and pinning data in the registry"""
+
+from os.path import join
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper
+from fast_plotting.registry import DataRegistry
+from fast_plotting.sources import close_sources
+
+# 10 x 2 float64 values
+N_BYTES = 160
+
+
+def make_registry(tmp_path, memory_budget, keys=("a", "b", "c")):
+    filepath = join(tmp_path, "data.npz")
+    np.savez(filepath, **{k: np.full((10, 2), float(i)) for i, k in enumerate(keys)})
+    registry = DataRegistry(memory_budget)
+    for k in keys:
+        registry.register_source({"source_name": "npz", "identifier": k, "filepath": filepath, "key": k})
+    return registry
+
+def test_evict_least_recently_used(tmp_path):
+    registry = make_registry(tmp_path, 2 * N_BYTES)
+    registry.get("a")
+    registry.get("b")
+    # a is used more recently than b now
+    registry.get("a")
+    registry.get("c")
+    assert list(registry.data) == ["a", "c"]
+    assert registry.memory == 2 * N_BYTES and registry.evictions == 1
+    # evicted data is loaded again
+    assert registry.get("b").data[0, 0] == 1.
+    assert "b" in registry.data and "a" not in registry.data
+    close_sources()
+
+def test_pinned_not_evicted(tmp_path):
+    registry = make_registry(tmp_path, N_BYTES)
+    with registry.pinned(["a"]):
+        registry.get("a")
+        registry.get("b")
+        assert registry.get("c").data[0, 0] == 2.
+        # whatever does not fit next to pinned data is not kept
+        assert list(registry.data) == ["a"]
+    registry.get("b")
+    assert list(registry.data) == ["b"]
+    assert registry.memory == N_BYTES
+    close_sources()
+
+def test_data_without_source_kept():
+    registry = DataRegistry(0)
+    registry.add("x", DataWrapper("x", np.zeros((10, 2))))
+    assert "x" in registry.data
+
+def test_memory_after_replace():
+    registry = DataRegistry()
+    registry.add("x", DataWrapper("x", np.zeros((10, 2))))
+    registry.add("x", DataWrapper("x", np.zeros((5, 2))))
+    assert registry.memory == N_BYTES // 2
+    registry.remove("x")
+    assert registry.memory == 0
+
+def test_concurrent_get(tmp_path):
+    keys = [f"h{i}" for i in range(20)]
+    registry = make_registry(tmp_path, 5 * N_BYTES, keys)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda k: registry.get(k).data[0, 0], keys * 10))
+    assert values == [float(i) for i in range(20)] * 10
+    assert registry.memory == sum(d.nbytes for d in registry.data.values()) <= 5 * N_BYTES
+    assert registry.hits + registry.misses == 200
+    close_sources()
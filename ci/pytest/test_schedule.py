@@ -0,0 +1,37 @@
+"""Scheduling plots such that shared data is released early"""
+
+from os.path import join
+from time import perf_counter
+
+from fast_plotting.schedule import schedule_batches, estimate_peak, estimate_sizes
+
+
+def make_batches(*objects):
+    return [{"identifier": str(i), "objects": [{"identifier": o} for o in o_list]} for i, o_list in enumerate(objects)]
+
+def test_order_and_peak():
+    """Plots sharing data are moved next to each other which lowers the peak"""
+    batches = make_batches(["a", "x"], ["b"], ["a", "y"], ["b", "z"], ["c"])
+    scheduled = schedule_batches(batches)
+    assert [b["identifier"] for b in scheduled] == ["0", "2", "1", "3", "4"]
+    assert estimate_peak(batches) == 3
+    assert estimate_peak(scheduled) == 2
+    weights = {"a": 100, "b": 10, "x": 1, "y": 1, "z": 1, "c": 1}
+    assert estimate_peak(batches, weights) == 111
+    assert estimate_peak(scheduled, weights) == 101
+
+def test_sizes(tmp_path):
+    """Sources share the size of their file"""
+    filepath = join(tmp_path, "data.bin")
+    with open(filepath, "wb") as f:
+        f.write(b"0" * 1000)
+    sources = {"a": {"filepath": filepath}, "b": {"filepath": filepath}, "c": {}}
+    assert estimate_sizes(make_batches(["a", "c"]), sources) == {"a": 500}
+
+def test_scales():
+    """Many plots sharing one reference do not make scheduling quadratic"""
+    batches = make_batches(*(["reference", i] for i in range(20000)))
+    start = perf_counter()
+    scheduled = schedule_batches(batches)
+    assert perf_counter() - start < 5
+    assert estimate_peak(scheduled) == 2
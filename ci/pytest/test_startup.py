@@ -0,0 +1,66 @@
+"""Make sure commands only import what they need"""
+
+import sys
+import subprocess
+from os.path import join, isfile
+
+import numpy as np
+
+EXAMPLES_PATH="examples"
+
+# per command, heavy modules which must not be imported
+STARTUP_BUDGETS = {"inspect": ("ROOT", "matplotlib", "numpy"),
+                   "configure": ("matplotlib",),
+                   "plot": ("ROOT",),
+                   "convert": ("ROOT", "matplotlib")}
+# seconds a command may take for tiny inputs, generous to not depend on the machine but way below
+# what importing plotting libraries on top would cost
+STARTUP_SECONDS = 1.5
+
+CHECK_IMPORTS = """
+import sys
+from time import perf_counter
+start = perf_counter()
+from fast_plotting.run import main
+sys.argv = ["run.py"] + sys.argv[1:]
+try:
+    main()
+except SystemExit:
+    pass
+print(f"SECONDS:{{perf_counter() - start}}")
+print("IMPORTED:" + ",".join(m for m in {forbidden} if m in sys.modules))
+"""
+
+def run_command(forbidden, *args):
+    """Run a command in a fresh interpreter
+
+    Returns:
+        str, float: forbidden modules which were imported and seconds spent in the command including imports
+    """
+    result = subprocess.run([sys.executable, "-c", CHECK_IMPORTS.format(forbidden=forbidden), *args],
+                            stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    lines = result.stdout.splitlines()
+    return lines[-1][len("IMPORTED:"):], float(lines[-2][len("SECONDS:"):])
+
+def imported_modules(forbidden, *args):
+    """Run a command in a fresh interpreter and return which of the forbidden modules were imported"""
+    return run_command(forbidden, *args)[0]
+
+def test_inspect():
+    """inspect only reads the configuration"""
+    assert not imported_modules(STARTUP_BUDGETS["inspect"], "inspect", "-c", join(EXAMPLES_PATH, "test.json"))
+
+def test_help():
+    """nothing heavy is needed to show the usage of any command"""
+    for command, forbidden in STARTUP_BUDGETS.items():
+        assert not imported_modules(forbidden, command, "--help")
+
+def test_configure(tmp_path):
+    """configuring single and overlay plots neither needs matplotlib nor takes long"""
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, h=np.zeros((10, 2)), h_0=np.ones((10, 2)))
+    config_path = join(tmp_path, "config.json")
+    imported, seconds = run_command(STARTUP_BUDGETS["configure"], "configure", "-f", npz_path, "--single", "--overlay", "-o", config_path)
+    assert not imported
+    assert seconds < STARTUP_SECONDS
+    assert isfile(config_path)
@@ -0,0 +1,59 @@
+"""Memory-mapped store of all data of a configuration"""
+
+from os import utime, stat
+from os.path import join
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.store import DataStore, write_store, make_store, STORE_ALIGNMENT
+from fast_plotting.config import configure_from_sources, add_plot_for_each_source
+from fast_plotting.cache import CACHE_SETTINGS, configure_cache
+from fast_plotting.registry import clear_registry, close_sources
+
+
+def test_round_trip(tmp_path):
+    path = join(tmp_path, "data.store")
+    data_wrappers = [DataWrapper("a", np.arange(6.).reshape(3, 2), data_annotations=DataAnnotations(axis_labels=["x", "y"])),
+                     DataWrapper("b", np.arange(7, dtype=np.float32).reshape(7, 1), uncertainties=np.ones((7, 1)), error_axes=[0]),
+                     DataWrapper("c", np.asfortranarray(np.arange(12.).reshape(4, 3)))]
+    write_store(path, iter(data_wrappers), key="key")
+    store = DataStore(path)
+    assert store.key == "key" and "b" in store and "d" not in store
+    for data_wrapper in data_wrappers:
+        stored = store.get(data_wrapper.name)
+        assert np.array_equal(stored.data, data_wrapper.data) and stored.data.dtype == data_wrapper.data.dtype
+        assert np.shares_memory(stored.data, store.buffer)
+        assert stored.data.ctypes.data % STORE_ALIGNMENT == store.buffer.ctypes.data % STORE_ALIGNMENT
+        assert (stored.errors is None) == (data_wrapper.errors is None)
+        assert list(stored.error_axes) == list(data_wrapper.error_axes)
+        assert list(stored.data_annotations.axis_labels) == list(data_wrapper.data_annotations.axis_labels)
+    assert np.array_equal(store.get("b").errors, np.ones((7, 1)))
+
+def test_reuse_and_invalidate(tmp_path):
+    """An up-to-date store is reused, a changed source makes it written again"""
+    npz_path = join(tmp_path, "data.npz")
+    np.savez(npz_path, h=np.column_stack((np.arange(5.), np.arange(5.)**2)))
+    config = configure_from_sources([npz_path], ["data"])
+    add_plot_for_each_source(config)
+    config.enable_plots("all")
+    path = join(tmp_path, "data.store")
+    enable_cache = CACHE_SETTINGS["enable"]
+    configure_cache(False)
+    try:
+        store = make_store(config, path)
+        (identifier,) = store.entries
+        assert np.array_equal(store.get(identifier).data[:,1], np.arange(5.)**2)
+        mtime = stat(path).st_mtime_ns
+        assert make_store(config, path).key == store.key
+        assert stat(path).st_mtime_ns == mtime
+        np.savez(npz_path, h=np.column_stack((np.arange(5.), np.arange(5.)**3)))
+        utime(npz_path, ns=(1, 1))
+        close_sources()
+        updated = make_store(config, path)
+        assert updated.key != store.key
+        assert np.array_equal(updated.get(identifier).data[:,1], np.arange(5.)**3)
+    finally:
+        configure_cache(enable_cache)
+        clear_registry()
+        close_sources()
@@ -0,0 +1,32 @@
+"""Summary pages and galleries"""
+
+from os import makedirs
+from os.path import join
+
+from fast_plotting.summary import make_page_batches, make_thumbnail_batches, write_gallery
+
+
+def test_pages():
+    batches = [{"identifier": str(i), "objects": [{"identifier": f"s{i}"}], "output": f"{i}.png"} for i in range(7)]
+    pages = make_page_batches(batches, 3, "pdf")
+    assert [len(p["page"]) for p in pages] == [3, 3, 1]
+    assert [p["output"] for p in pages] == ["summary_0.pdf", "summary_1.pdf", "summary_2.pdf"]
+    assert pages[2]["objects"] == [{"identifier": "s6"}]
+
+def test_gallery(tmp_path):
+    """Thumbnails do not overwrite each other and only existing plots are linked"""
+    batches = [{"identifier": "a", "objects": [], "output": "a/b.png"},
+               {"identifier": "b", "objects": [], "output": "a_b.png"},
+               {"identifier": "c", "objects": [], "output": "c/b.png"}]
+    thumbnails = make_thumbnail_batches(batches, "fast")
+    assert len({t["output"] for t in thumbnails}) == 3
+    makedirs(join(tmp_path, "a"))
+    with open(join(tmp_path, "a", "b.png"), "wb"):
+        pass
+    index = join(tmp_path, "index.html")
+    write_gallery(index, batches, thumbnails)
+    with open(index, "r", encoding="utf-8") as f:
+        html = f.read()
+    assert "href=\"a/b.png\"" in html
+    assert "href=\"a_b.png\"" not in html and "href=\"c/b.png\"" not in html
+    assert all(t["output"] in html for t in thumbnails)
@@ -0,0 +1,44 @@
+"""Plot from NumPy and CSV files, no ROOT needed"""
+
+from os.path import join, isfile
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from fast_plotting.config import configure_from_sources, add_plot_for_each_source
+from fast_plotting.registry import clear_registry, close_sources
+from fast_plotting.plot import plot
+
+
+def write_inputs(directory):
+    """Write some random spectra to a .npz and a .csv file"""
+    rng = np.random.default_rng(42)
+    x = np.linspace(0., 10., 100)
+    spectra = {f"spectrum_{i}": np.column_stack((x, rng.poisson(100, len(x)))).astype(float) for i in range(3)}
+    errors = {f"{k}__errors": np.sqrt(v[:,1:]) for k, v in spectra.items()}
+    npz_path = join(directory, "spectra.npz")
+    np.savez(npz_path, **spectra, **errors)
+
+    csv_path = join(directory, "spectra.csv")
+    y = rng.normal(10., 1., len(x))
+    np.savetxt(csv_path, np.column_stack((x, y, np.full(len(x), 0.5))), delimiter=",", header="x,y,y_err", comments="")
+    return npz_path, csv_path
+
+def run_example(show=True):
+    """Configure from the files and plot everything"""
+    with TemporaryDirectory() as directory:
+        sources = write_inputs(directory)
+        config = configure_from_sources(list(sources), ["npz", "csv"])
+        add_plot_for_each_source(config)
+        config.enable_plots("all")
+        if show:
+            config.print_sources()
+            config.print_plots()
+        out_dir = join(directory, "plots")
+        failed = plot(config, out_dir)
+        close_sources()
+        clear_registry()
+        return not failed and all(isfile(join(out_dir, p["output"])) for p in config.get_plots())
+
+if __name__ == "__main__":
+    run_example()
@@ -0,0 +1,4 @@
+"""FastPlotting"""
+
+# keep in sync with setup.py
+__version__ = "0.0.1"
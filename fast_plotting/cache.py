@@ -0,0 +1,169 @@
+"""Persistent on-disk cache of converted data
+
+Each entry is a directory named by a hash of the source description and the state of the
+source file. It contains data.npy, optionally uncertainties.npy and meta.json holding annotations
+and the layout of uncertainties. Cache hits are memory-mapped instead of being converted again.
+"""
+
+from os import environ, listdir, rename, stat, utime
+from os.path import join, isdir, getsize, expanduser
+from shutil import rmtree
+from tempfile import mkdtemp
+from hashlib import sha1
+import json
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.io import file_stamp, make_dir
+from fast_plotting.logger import get_logger
+
+CACHE_LOGGER = get_logger("Cache")
+
+# bump whenever the layout of cache entries changes
+CACHE_VERSION = 2
+# fields of a source batch which do not influence its content
+CACHE_IGNORE_FIELDS = ("identifier", "label")
+
+CACHE_SETTINGS = {"enable": True,
+                  "directory": environ.get("FAST_PLOTTING_CACHE_DIR", join("~", ".cache", "fast_plotting")),
+                  "max_size": 2 * 1024**3,
+                  # current size of the cache in bytes, computed when first needed
+                  "size": None}
+
+
+def configure_cache(enable=True, directory=None, max_size=None):
+    """Configure the cache
+
+    Args:
+        enable: bool
+            whether or not to use the cache at all
+        directory: str (optional)
+            where to put the cache
+        max_size: int (optional)
+            maximum size in bytes, least recently used entries are evicted beyond that
+    """
+    CACHE_SETTINGS["enable"] = enable
+    if directory:
+        CACHE_SETTINGS["directory"] = directory
+        CACHE_SETTINGS["size"] = None
+    if max_size is not None:
+        CACHE_SETTINGS["max_size"] = max_size
+
+def get_cache_dir():
+    """Get the expanded cache directory"""
+    return expanduser(CACHE_SETTINGS["directory"])
+
+def clear_cache():
+    """Remove all cache entries"""
+    cache_dir = get_cache_dir()
+    if isdir(cache_dir):
+        rmtree(cache_dir)
+    CACHE_SETTINGS["size"] = 0
+    CACHE_LOGGER.info("Cleared cache at %s", cache_dir)
+
+def cache_key(batch):
+    """Derive the cache key from a source batch
+
+    Returns:
+        str or None: the key or None if this source cannot be cached
+    """
+    if "filepath" not in batch:
+        return None
+    stamp = file_stamp(batch["filepath"])
+    if stamp is None:
+        return None
+    key = {k: v for k, v in batch.items() if k not in CACHE_IGNORE_FIELDS}
+    key["stamp"] = stamp
+    key["version"] = CACHE_VERSION
+    return sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def entry_size(entry_dir):
+    return sum(getsize(join(entry_dir, f)) for f in listdir(entry_dir))
+
+def cache_size():
+    """Get the current size of the cache in bytes"""
+    if CACHE_SETTINGS["size"] is None:
+        cache_dir = get_cache_dir()
+        entries = listdir(cache_dir) if isdir(cache_dir) else []
+        CACHE_SETTINGS["size"] = sum(entry_size(join(cache_dir, e)) for e in entries)
+    return CACHE_SETTINGS["size"]
+
+def evict(max_size):
+    """Evict least recently used entries until the cache is not larger than max_size"""
+    cache_dir = get_cache_dir()
+    if cache_size() <= max_size or not isdir(cache_dir):
+        return
+    # usage is marked by touching the entry directory
+    entries = [join(cache_dir, e) for e in listdir(cache_dir)]
+    entries.sort(key=lambda e: stat(e).st_mtime_ns)
+    for e in entries:
+        if CACHE_SETTINGS["size"] <= max_size:
+            break
+        CACHE_SETTINGS["size"] -= entry_size(e)
+        rmtree(e, ignore_errors=True)
+        CACHE_LOGGER.debug("Evicted cache entry %s", e)
+
+def load_from_cache(batch):
+    """Load converted data of a source if cached
+
+    Returns:
+        DataWrapper or None: the cached data or None if not cached
+    """
+    if not CACHE_SETTINGS["enable"]:
+        return None
+    key = cache_key(batch)
+    if key is None:
+        return None
+    entry_dir = join(get_cache_dir(), key)
+    if not isdir(entry_dir):
+        return None
+    try:
+        with open(join(entry_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        data = np.load(join(entry_dir, "data.npy"), mmap_mode="r")
+        uncertainties = None
+        if meta["has_uncertainties"]:
+            uncertainties = np.load(join(entry_dir, "uncertainties.npy"), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        CACHE_LOGGER.warning("Cache entry %s seems to be broken, ignore it", entry_dir)
+        return None
+    # mark as recently used
+    utime(entry_dir)
+    CACHE_LOGGER.debug("Loaded %s from cache", batch["identifier"])
+    return DataWrapper(batch["identifier"], data, uncertainties=uncertainties, symmetric=meta["symmetric"],
+                       error_axes=meta["error_axes"], data_annotations=DataAnnotations(**meta["annotations"]))
+
+def save_to_cache(batch, data_wrapper):
+    """Save converted data of a source to the cache"""
+    if not CACHE_SETTINGS["enable"]:
+        return
+    key = cache_key(batch)
+    if key is None:
+        return
+    cache_dir = get_cache_dir()
+    entry_dir = join(cache_dir, key)
+    if isdir(entry_dir):
+        return
+    make_dir(cache_dir)
+    # make sure the size is known before adding anything
+    cache_size()
+    # write to a temporary directory first so that no half-written entry can ever be picked up
+    tmp_dir = mkdtemp(prefix=f".{key}.", dir=cache_dir)
+    np.save(join(tmp_dir, "data.npy"), data_wrapper.data)
+    if data_wrapper.errors is not None:
+        np.save(join(tmp_dir, "uncertainties.npy"), data_wrapper.errors)
+    meta = {"has_uncertainties": data_wrapper.errors is not None,
+            "symmetric": data_wrapper.symmetric,
+            "error_axes": data_wrapper.error_axes,
+            "annotations": data_wrapper.data_annotations.to_dict()}
+    with open(join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    try:
+        rename(tmp_dir, entry_dir)
+    except OSError:
+        # somebody else was faster
+        rmtree(tmp_dir, ignore_errors=True)
+        return
+    CACHE_SETTINGS["size"] += entry_size(entry_dir)
+    evict(CACHE_SETTINGS["max_size"])
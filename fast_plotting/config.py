@@ -1,15 +1,50 @@
 """Configuration interface"""
 
+from concurrent.futures import ProcessPoolExecutor
+from os.path import isfile, expanduser
+from fnmatch import translate
+import re
+
 from fast_plotting.logger import get_logger
-from fast_plotting.io import parse_json, dump_json
-from fast_plotting.sources.root import extract_from_source
+from fast_plotting.io import parse_json, dump_config, iter_records, is_incremental
+from fast_plotting.sources import discover
 
 CONFIG_LOGGER = get_logger("Config")
 
+# prefix to select plots by regular expression instead of glob pattern
+REGEX_PREFIX = "re:"
+# characters making an identifier a glob pattern
+GLOB_CHARACTERS = ("*", "?", "[")
+# plot type of generated plots, fast_plotting.plot.PLOT_TYPE_STEP which is not imported to not need matplotlib
+GENERATED_PLOT_TYPE = "step"
+
+
+def compile_selection(patterns):
+    """Compile glob patterns and regular expressions into one regular expression
+
+    Args:
+        patterns: iterable
+            glob patterns or regular expressions prefixed with REGEX_PREFIX
+    Returns:
+        compiled regular expression or None if there are no patterns
+    """
+    regexes = [p[len(REGEX_PREFIX):] if p.startswith(REGEX_PREFIX) else translate(p) for p in patterns]
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+def is_pattern(identifier):
+    """Whether or not an identifier is meant to select several plots"""
+    return identifier.startswith(REGEX_PREFIX) or any(c in identifier for c in GLOB_CHARACTERS)
 
 class ConfigInterface:
     def __init__(self):
         self._config = None
+        # identifiers mapped to sources and plots, kept in sync with the configuration
+        self._source_index = {}
+        self._plot_index = {}
+        # source identifiers mapped to the plots using them
+        self._source_to_plots = {}
 
     def __is_sane(self):
         if self._config is None:
@@ -24,28 +59,130 @@ class ConfigInterface:
             return
         self._config = {"sources": [], "plots": []}
 
+    def __index_source(self, source):
+        """Index a source, returns False if it is a duplicate which is dropped"""
+        identifier = source["identifier"]
+        if identifier in self._source_index:
+            CONFIG_LOGGER.warning("Source %s exists already, keeping the first one", identifier)
+            return False
+        self._source_index[identifier] = source
+        return True
+
+    def __index_plot(self, plot):
+        """Index a plot, returns False if it is a duplicate which is dropped"""
+        identifier = plot.get("identifier")
+        if identifier is not None:
+            if identifier in self._plot_index:
+                CONFIG_LOGGER.warning("Plot %s exists already, keeping the first one", identifier)
+                return False
+            self._plot_index[identifier] = plot
+        for o in plot.get("objects", []):
+            self._source_to_plots.setdefault(o["identifier"], []).append(plot)
+        return True
+
+    def __build_index(self):
+        self._source_index = {}
+        self._plot_index = {}
+        self._source_to_plots = {}
+        if self._config is None:
+            return
+        self._config["sources"] = [s for s in self._config["sources"] if self.__index_source(s)]
+        self._config["plots"] = [p for p in self._config["plots"] if self.__index_plot(p)]
+
     def read(self, path):
         if self._config is not None:
             CONFIG_LOGGER.warning("Overwriting existing configuration")
+        if is_incremental(path):
+            for _ in self.iter_read(path):
+                pass
+            return
         self._config = parse_json(path)
         self.__is_sane()
+        self.__build_index()
+
+    def iter_read(self, path):
+        """Read a configuration record by record
+
+        Sources and plots are added as soon as they are read, so plots can be processed
+        before the whole configuration is there. Only JSON Lines and msgpack are actually read
+        incrementally, a JSON configuration is read at once.
+
+        Args:
+            path: str
+                path to configuration
+        Yields:
+            dict: each plot right after it has been added
+        """
+        self._config = None
+        self.__initialise()
+        self.__build_index()
+        for field, record in iter_records(path):
+            indexed = self.__index_source(record) if field == "sources" else self.__index_plot(record)
+            if not indexed:
+                continue
+            self._config[field].append(record)
+            if field == "plots":
+                yield record
 
     def write(self, path):
         if self._config is None:
             CONFIG_LOGGER.warning("No configuration to write")
             return
-        dump_json(self._config, path)
+        dump_config(self._config, path)
         CONFIG_LOGGER.info("Written configuration to %s", path)
 
     def add_data_source(self, source_name, identifier, **kwargs):
         self.__initialise()
         kwargs["source_name"] = source_name
         kwargs["identifier"] = identifier
-        self._config["sources"].append(kwargs)
+        if self.__index_source(kwargs):
+            self._config["sources"].append(kwargs)
 
     def add_plot(self, **kwargs):
         self.__initialise()
-        self._config["plots"].append(kwargs)
+        if self.__index_plot(kwargs):
+            self._config["plots"].append(kwargs)
+
+    def unique_plot_identifier(self, identifier):
+        """The identifier itself if no plot has it yet, otherwise the first free one with a numeric suffix"""
+        unique = identifier
+        suffix = 1
+        while unique in self._plot_index:
+            unique = f"{identifier}_{suffix}"
+            suffix += 1
+        return unique
+
+    def get_source(self, identifier):
+        """Get a source by identifier, None if it does not exist"""
+        return self._source_index.get(identifier)
+
+    def get_source_index(self):
+        """Get all sources mapped by their identifier"""
+        return self._source_index
+
+    def get_plot(self, identifier):
+        """Get a plot by identifier, None if it does not exist"""
+        return self._plot_index.get(identifier)
+
+    def get_plots_for_source(self, identifier):
+        """Get all plots using a source"""
+        return self._source_to_plots.get(identifier, [])
+
+    def select_plots(self, *patterns):
+        """Get identifiers of plots matching any of the given identifiers or patterns
+
+        Identifiers of existing plots are always taken literally, even if they look like a pattern,
+        e.g. "hPt[0]".
+
+        Args:
+            patterns: iterable
+                plot identifiers, glob patterns or regular expressions prefixed with "re:"
+        """
+        selected = {p for p in patterns if p in self._plot_index}
+        regex = compile_selection(p for p in patterns if p not in self._plot_index and is_pattern(p))
+        if regex:
+            selected.update(i for i in self._plot_index if regex.fullmatch(i))
+        return selected
 
     def get_sources(self):
         if self._config is None:
@@ -62,23 +199,25 @@ class ConfigInterface:
 
         Args:
             identifiers: iterable
-                can be strings to JSON or plot's identifier (latter takes precedence, in particular "all" is specified)
+                can be strings to JSON or plot's identifier (latter takes precedence, in particular "all" is specified).
+                Identifiers can also be glob patterns or regular expressions prefixed with "re:"
         """
         self.__initialise()
         enable_all = "all" in identifiers
 
         enable_identifiers = []
         for i in identifiers:
-            from_json = parse_json(i)
+            from_json = parse_json(i) if isfile(expanduser(i)) else None
             if not from_json:
                 enable_identifiers.append(i)
                 continue
             for ij in from_json.get("enable", []):
                 enable_identifiers.append(ij)
+        enable_identifiers = self.select_plots(*enable_identifiers)
 
         n_enabled = 0
         for c in self._config["plots"]:
-            if enable_all or c["identifier"] in enable_identifiers:
+            if enable_all or c.get("identifier") in enable_identifiers:
                 c["enable"] = True
                 n_enabled += 1
                 CONFIG_LOGGER.debug("Enabling plot %s", c["identifier"])
@@ -100,28 +239,85 @@ class ConfigInterface:
         text = "#" * len(text) + "\n" + text + "\n" + "#" * len(text) + "\n"
         print(text)
         for s in self.get_plots():
-            print(f"  {s['identifier']}, enabled: {s['enable']}")
+            print(f"  {s.get('identifier', s['output'])}, enabled: {s.get('enable', False)}")
         print("\n")
 
+def extract_batches(source):
+    """Extract batches from a source with the source handling its file type"""
+    return discover(source) or None
+
+def try_extract_batches(source):
+    """Extract batches, errors are returned instead of raised so that they can be reported from any process
+
+    Returns:
+        list or None, str or None: batches and what went wrong
+    """
+    try:
+        return extract_batches(source), None
+    except Exception as e: # pylint: disable=broad-except
+        return None, f"{type(e).__name__}: {e}"
+
+def report_extract_error(source, batches, error):
+    """Log what went wrong when extracting batches from a source, returns the batches"""
+    if error:
+        CONFIG_LOGGER.error("Cannot read %s: %s", source, error)
+    return batches
+
+def extract_batches_same_structure(sources):
+    """Extract batches from first source and assume the same structure for all others"""
+    batches_first = report_extract_error(sources[0], *try_extract_batches(sources[0]))
+    all_batches = [batches_first]
+    for s in sources[1:]:
+        if batches_first is None:
+            all_batches.append(None)
+            continue
+        all_batches.append([{**b, "filepath": s} for b in batches_first])
+    return all_batches
+
 def configure_from_sources(sources, labels=None, **kwargs):
+    """Configure from a list of sources
+
+    Args:
+        sources: iterable
+            sources to extract data batches from
+        labels: iterable (optional)
+            one label per source
+        kwargs: dict
+            input_config_path: str
+                configuration to be extended
+            jobs: int
+                number of processes used to scan sources in parallel
+            same_structure: bool
+                if True, only the first source is scanned and assumed to have the same structure as all others
+    """
     if not sources:
         CONFIG_LOGGER.error("There are no sources to configure from")
         return ConfigInterface()
     if labels and len(sources) != len(labels):
-        CONFIG_LOGGER.critical("Need same number of sources and labels, %d vs. %d", len(source), len(labels))
-    extract_funcs = (extract_from_source,)
+        CONFIG_LOGGER.critical("Need same number of sources and labels, %d vs. %d", len(sources), len(labels))
+    if not labels:
+        labels = [""] * len(sources)
     config = ConfigInterface()
     input_config_path = kwargs.pop("input_config_path", None)
+    jobs = kwargs.pop("jobs", 1)
+    same_structure = kwargs.pop("same_structure", False)
     if input_config_path:
         config.read(input_config_path)
-    for i, (s, l) in enumerate(zip(sources, labels)):
-        batches = None
-        for ef in extract_funcs:
-            batches = ef(s)
-            if batches:
-                break
+
+    if same_structure:
+        all_batches = extract_batches_same_structure(sources)
+    else:
+        if jobs > 1 and len(sources) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(sources))) as executor:
+                # map keeps the order of the sources and hence the identifiers stable
+                results = list(executor.map(try_extract_batches, sources))
+        else:
+            results = [try_extract_batches(s) for s in sources]
+        all_batches = [report_extract_error(source, *result) for source, result in zip(sources, results)]
+
+    for i, (batches, l, source) in enumerate(zip(all_batches, labels, sources)):
         if batches is None:
-            CONFIG_LOGGER.error("Cannot extract anything from source")
+            CONFIG_LOGGER.error("Cannot extract anything from source %s", source)
             continue
 
         for b in batches:
@@ -135,3 +331,35 @@ def read_config(path):
     config = ConfigInterface()
     config.read(path)
     return config
+
+def add_plot_for_each_source(config, output_format="png"):
+    """Add a plot dictionary for each source automatically
+
+    Args:
+        config: ConfigInterface
+        output_format: str
+            file format of the plots, given by the extension of their output
+    """
+    for s in config.get_sources():
+        identifier = config.unique_plot_identifier(s["identifier"])
+        objects = [{"identifier": s["identifier"], "type": GENERATED_PLOT_TYPE, "label": s.get("label", "")}]
+        config.add_plot(identifier=identifier, objects=objects, title=s["identifier"], enable=False, output=f"{identifier}.{output_format}")
+
+def add_overlay_plot_for_sources(config, output_format="png"):
+    """Make overlay plots if possible
+
+    Args:
+        config: ConfigInterface
+        output_format: str
+            file format of the plots, given by the extension of their output
+    """
+    objects = {}
+    for s in config.get_sources():
+        identifier = s["identifier"]
+        identifier_key = "_".join(identifier.split("_")[:-1])
+        if identifier_key not in objects:
+            objects[identifier_key] = []
+        objects[identifier_key].append({"identifier": identifier, "type": GENERATED_PLOT_TYPE, "label": s.get("label", "")})
+    for k, o in objects.items():
+        identifier = config.unique_plot_identifier(k)
+        config.add_plot(identifier=identifier, objects=o, title=k, enable=False, output=f"{identifier}.{output_format}")
@@ -18,6 +18,8 @@ DATA_LOGGER = get_logger("Data")
 class DataAnnotations:
     """Holding data annotations"""
 
+    __slots__ = ("axis_labels",)
+
     def __init__(self, **kwargs):
         """init
 
@@ -25,23 +27,92 @@ class DataAnnotations:
         """
         self.axis_labels = kwargs.pop("axis_labels", [""] * 3)
 
+    def to_dict(self):
+        """Everything needed to re-create these annotations"""
+        return {"axis_labels": list(self.axis_labels)}
+
 class DataWrapper:
-    """Holding the actual data identified by name"""
+    """Holding the actual data identified by name
+
+    Uncertainties are stored compactly. They can be absent, given only for some axes
+    and be symmetric, in which case only one value per point and axis is stored.
+    """
+
+    __slots__ = ("name", "data", "errors", "error_axes", "symmetric", "data_annotations")
 
     def __init__(self, name, data, **kwargs):
-        """init"""
+        """init
+
+        Args:
+            name: str
+                unique name
+            data: numpy.ndarray
+                data of shape (n, dim)
+            kwargs: dict
+                uncertainties: numpy.ndarray (optional)
+                    of shape (n, n_error_axes, 2) or (n, n_error_axes) if symmetric
+                symmetric: bool
+                    whether uncertainties are symmetric, default False
+                error_axes: iterable (optional)
+                    axes uncertainties are given for, default are all axes
+                dtype: numpy type (optional)
+                    type to store data and uncertainties with, e.g. float32 to save memory
+                data_annotations: DataAnnotations (optional)
+        """
         # the name should be unique
         self.name = name
+        dtype = kwargs.pop("dtype", None)
         # numpy array of data
-        self.data = data
+        self.data = data if dtype is None else data.astype(dtype, copy=False)
         # uncertainties
-        self.uncertainties = kwargs.pop("uncertainties", None)
-        shape_expected = (2 for _ in range(data.shape[1]))
-        shape_expected = (data.shape[0], *shape_expected)
-        if self.uncertainties is None:
-            self.uncertainties = np.full(shape_expected, 0.)
-        if shape_expected != self.uncertainties.shape:
-            # critical if shapes don't match
-            DATA_LOGGER.critical("Got incompatible shapes of data and uncertainties %s (expected) vs. %s (given)", f"{shape_expected}", f"{self.uncertainties.shape}")
+        uncertainties = kwargs.pop("uncertainties", None)
+        self.symmetric = kwargs.pop("symmetric", False)
+        self.error_axes = tuple(kwargs.pop("error_axes", range(data.shape[1])))
+        if uncertainties is not None:
+            shape_expected = (data.shape[0], len(self.error_axes)) if self.symmetric else (data.shape[0], len(self.error_axes), 2)
+            if shape_expected != uncertainties.shape:
+                # critical if shapes don't match
+                DATA_LOGGER.critical("Got incompatible shapes of data and uncertainties %s (expected) vs. %s (given)",
+                                     f"{shape_expected}", f"{uncertainties.shape}")
+            if dtype is not None:
+                uncertainties = uncertainties.astype(dtype, copy=False)
+        self.errors = uncertainties
         # annotations
         self.data_annotations = kwargs.pop("data_annotations", DataAnnotations(axis_labels=["label"] * data.shape[1]))
+
+    @property
+    def uncertainties(self):
+        """Full uncertainties of shape (n, dim, 2)
+
+        This is only a view if uncertainties are stored for all axes and are not symmetric.
+        Use get_errors to avoid creating the full array.
+        """
+        shape = (self.data.shape[0], self.data.shape[1], 2)
+        if self.errors is None:
+            # zero-strided, does not take any memory
+            return np.broadcast_to(np.zeros((), dtype=self.data.dtype), shape)
+        if not self.symmetric and len(self.error_axes) == self.data.shape[1]:
+            return self.errors
+        uncertainties = np.zeros(shape, dtype=self.errors.dtype)
+        for i, axis in enumerate(self.error_axes):
+            uncertainties[:,axis,:] = self.errors[:,i,None] if self.symmetric else self.errors[:,i,:]
+        return uncertainties
+
+    def get_errors(self, axis):
+        """Uncertainties along one axis
+
+        Returns:
+            None if there are no uncertainties along this axis, otherwise a view of shape (n,)
+            if symmetric or (2, n) for lower and upper uncertainties
+        """
+        if self.errors is None or axis not in self.error_axes:
+            return None
+        i = self.error_axes.index(axis)
+        if self.symmetric:
+            return self.errors[:,i]
+        return self.errors[:,i,:].T
+
+    @property
+    def nbytes(self):
+        """Memory taken by data and uncertainties"""
+        return self.data.nbytes + (self.errors.nbytes if self.errors is not None else 0)
@@ -0,0 +1,76 @@
+"""Reduce large series to what can actually be seen
+
+Series are split into buckets of consecutive points, roughly one bucket per pixel column.
+Lines and steps keep the minimum and maximum of each bucket so that no peak is lost. Bars are
+rebinned to the mean of each bucket with uncertainties combined accordingly. Other plot types
+such as scatter plots are not downsampled since every single marker can be seen.
+"""
+
+import numpy as np
+
+# plot types which keep minimum and maximum per bucket
+MIN_MAX_PLOT_TYPES = ("line", "step")
+# plot types for which the data is rebinned
+REBIN_PLOT_TYPES = ("bar",)
+
+
+def take_errors(err, indices):
+    """Select entries of uncertainties which can be None, of shape (n,) or (2, n)"""
+    if err is None:
+        return None
+    return np.take(err, indices, axis=-1)
+
+def min_max_indices(y, n_buckets):
+    """Indices of minimum and maximum per bucket, sorted"""
+    n = len(y)
+    bucket_size = int(np.ceil(n / n_buckets))
+    n_buckets = int(np.ceil(n / bucket_size))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, bucket_size)
+    # NaN in the original data must not win, so treat them as empty
+    offsets = np.arange(n_buckets) * bucket_size
+    with np.errstate(invalid="ignore"):
+        valid = ~np.all(np.isnan(padded), axis=1)
+        padded_valid = padded[valid]
+        indices = np.concatenate((np.nanargmin(padded_valid, axis=1) + offsets[valid],
+                                  np.nanargmax(padded_valid, axis=1) + offsets[valid]))
+    return np.unique(indices)
+
+def rebin_errors(err, starts, counts):
+    """Uncertainty of the bucket means assuming uncorrelated points"""
+    if err is None:
+        return None
+    return np.sqrt(np.add.reduceat(np.square(err), starts, axis=-1)) / counts
+
+def rebin(x, y, xerr, yerr, n_buckets):
+    """Rebin to the means of buckets of consecutive points"""
+    n = len(y)
+    bucket_size = int(np.ceil(n / n_buckets))
+    starts = np.arange(0, n, bucket_size)
+    counts = np.diff(np.append(starts, n))
+    x = np.add.reduceat(x, starts) / counts
+    y = np.add.reduceat(y, starts) / counts
+    return x, y, rebin_errors(xerr, starts, counts), rebin_errors(yerr, starts, counts)
+
+def downsample(x, y, plot_type, n_buckets, xerr=None, yerr=None):
+    """Downsample a series to roughly n_buckets buckets
+
+    Args:
+        x, y: numpy.ndarray
+            the series, assumed to be ordered along x
+        plot_type: str
+            how the series is going to be plotted
+        n_buckets: int
+            number of buckets, typically the width in pixels
+        xerr, yerr: numpy.ndarray (optional)
+            uncertainties of shape (n,) or (2, n)
+    Returns:
+        tuple: x, y, xerr, yerr after downsampling, unchanged for plot types not downsampled
+    """
+    if plot_type in REBIN_PLOT_TYPES:
+        return rebin(x, y, xerr, yerr, n_buckets)
+    if plot_type not in MIN_MAX_PLOT_TYPES:
+        return x, y, xerr, yerr
+    indices = min_max_indices(y, n_buckets)
+    return x[indices], y[indices], take_errors(xerr, indices), take_errors(yerr, indices)
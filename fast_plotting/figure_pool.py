@@ -0,0 +1,108 @@
+"""Recycle figures instead of constructing new ones for every plot
+
+Idle figures are kept together with their canvas and renderer. When reused, all artists are
+removed and the figure looks like a newly created one. In addition, the result of tight_layout
+is cached for figures whose layout relevant properties are the same.
+"""
+
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+
+from fast_plotting.logger import get_logger
+
+FIGURE_POOL_LOGGER = get_logger("FigurePool")
+
+# subplot parameters, left, bottom etc.
+SUBPLOT_PARAMS = ("left", "bottom", "right", "top", "wspace", "hspace")
+# maximum number of cached layouts, least recently used ones are dropped beyond that
+MAX_CACHED_LAYOUTS = 256
+
+
+def tick_labels(axis):
+    """Texts of the major tick labels and of the offset an axis is going to show"""
+    low, high = sorted(axis.get_view_interval())
+    # locators also return ticks just outside the view which are never drawn
+    locations = [t for t in axis.get_majorticklocs() if low <= t <= high]
+    formatter = axis.get_major_formatter()
+    return tuple(formatter.format_ticks(locations)), formatter.get_offset()
+
+def layout_key(figure):
+    """Collect everything which influences the outcome of tight_layout
+
+    Besides the figure size and the subplot structure, that is the text around each axes. Tick
+    labels are taken as they are shown rather than the axis limits, so that plots of different
+    data but with the same labels share their layout.
+    """
+    key = [tuple(figure.get_size_inches()), figure.dpi]
+    for ax in figure.get_axes():
+        legend = ax.get_legend()
+        legend_texts = tuple(t.get_text() for t in legend.get_texts()) if legend else ()
+        key.append((ax.get_subplotspec().get_geometry() if ax.get_subplotspec() else None,
+                    ax.get_xlabel(), ax.get_ylabel(), ax.get_title(), tick_labels(ax.xaxis), tick_labels(ax.yaxis), legend_texts))
+    return tuple(key)
+
+class FigurePool:
+    """Pool of figures to be reused"""
+
+    def __init__(self, max_size=2):
+        """init
+
+        Args:
+            max_size: int
+                maximum number of idle figures to keep
+        """
+        self.max_size = max_size
+        # figures not in use
+        self.idle = []
+        # ids of all figures owned by this pool
+        self.owned = set()
+        # cached results of tight_layout, least recently used first
+        self.layouts = OrderedDict()
+        # subplot parameters of a fresh figure
+        self.default_subplot_params = {p: plt.rcParams[f"figure.subplot.{p}"] for p in SUBPLOT_PARAMS}
+
+    def owns(self, figure):
+        """Whether or not a figure belongs to this pool"""
+        return id(figure) in self.owned
+
+    def get_axes(self, figsize):
+        """Get axes on an idle figure of the requested size or on a new one"""
+        for i, figure in enumerate(self.idle):
+            if tuple(figure.get_size_inches()) == tuple(figsize):
+                del self.idle[i]
+                figure.clear()
+                figure.subplots_adjust(**self.default_subplot_params)
+                return figure.add_subplot()
+        figure, ax = plt.subplots(figsize=figsize)
+        self.owned.add(id(figure))
+        return ax
+
+    def layout(self, figure):
+        """Apply tight layout, use cached result if possible"""
+        key = layout_key(figure)
+        params = self.layouts.get(key)
+        if params is None:
+            figure.tight_layout()
+            self.layouts[key] = {p: getattr(figure.subplotpars, p) for p in SUBPLOT_PARAMS}
+            if len(self.layouts) > MAX_CACHED_LAYOUTS:
+                self.layouts.popitem(last=False)
+            return
+        self.layouts.move_to_end(key)
+        FIGURE_POOL_LOGGER.debug("Use cached layout")
+        figure.subplots_adjust(**params)
+
+    def release(self, figure):
+        """Put a figure back to the pool after it has been saved"""
+        if len(self.idle) < self.max_size:
+            self.idle.append(figure)
+            return
+        self.owned.discard(id(figure))
+        plt.close(figure)
+
+    def close(self):
+        """Close all idle figures"""
+        for figure in self.idle:
+            self.owned.discard(id(figure))
+            plt.close(figure)
+        self.idle = []
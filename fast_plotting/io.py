@@ -1,20 +1,32 @@
 """Functionality to manage I/O"""
 
-from os.path import expanduser, isfile, isdir, exists
-from os import makedirs
+from os.path import expanduser, isfile, isdir, exists, abspath, splitext
+from os import makedirs, stat
 import json
 
 from fast_plotting.logger import get_logger
 
 IO_LOGGER = get_logger("IO")
 
+# one JSON document holding everything
+CONFIG_FORMAT_JSON = ".json"
+# JSON Lines, one record per line
+CONFIG_FORMAT_JSONL = ".jsonl"
+# stream of msgpack records, requires the msgpack package
+CONFIG_FORMAT_MSGPACK = ".msgpack"
+CONFIG_FORMATS = (CONFIG_FORMAT_JSON, CONFIG_FORMAT_JSONL, CONFIG_FORMAT_MSGPACK)
+# formats which can be read record by record
+INCREMENTAL_CONFIG_FORMATS = (CONFIG_FORMAT_JSONL, CONFIG_FORMAT_MSGPACK)
+# record keys mapped to the configuration fields they are collected in
+CONFIG_RECORD_KINDS = {"source": "sources", "plot": "plots"}
+
 def parse_json(filepath):
     """wrap JSON reading"""
     filepath = expanduser(filepath)
     if not isfile(filepath):
         IO_LOGGER.error("ERROR: JSON file %s does not exist.", filepath)
         return None
-    with open(filepath, "r") as f:
+    with open(filepath, "r", encoding="utf-8") as f:
         try:
             return json.load(f)
         except (UnicodeDecodeError, json.decoder.JSONDecodeError):
@@ -23,12 +35,108 @@ def parse_json(filepath):
 def dump_json(to_json, filepath):
     """wrap JSON writing"""
     filepath = expanduser(filepath)
-    with open(filepath, 'w') as f:
+    with open(filepath, 'w', encoding="utf-8") as f:
         json.dump(to_json, f, indent=2)
 
+def get_config_format(filepath):
+    """Format of a configuration file derived from its extension, JSON by default"""
+    extension = splitext(filepath)[1].lower()
+    return extension if extension in CONFIG_FORMATS else CONFIG_FORMAT_JSON
+
+def is_incremental(filepath):
+    """Whether or not a configuration file can be read record by record"""
+    return get_config_format(filepath) in INCREMENTAL_CONFIG_FORMATS
+
+def import_msgpack():
+    """msgpack is optional, only needed for the corresponding format"""
+    try:
+        import msgpack # pylint: disable=import-outside-toplevel
+    except ImportError:
+        IO_LOGGER.critical("Package msgpack is required for %s configurations, install it with \"pip install msgpack\"", CONFIG_FORMAT_MSGPACK)
+    return msgpack
+
+def iter_records(filepath):
+    """Read records of a configuration one by one
+
+    Sources and plots are written to JSON Lines or msgpack as single records of the form
+    {"source": {...}} or {"plot": {...}}, sources before the plots using them.
+
+    Args:
+        filepath: str
+            path to configuration
+    Yields:
+        str, dict: configuration field ("sources" or "plots") and the source or plot
+    """
+    filepath = expanduser(filepath)
+    if not isfile(filepath):
+        IO_LOGGER.critical("Configuration %s does not exist.", filepath)
+    config_format = get_config_format(filepath)
+
+    if config_format == CONFIG_FORMAT_JSON:
+        config = parse_json(filepath)
+        if config is None:
+            IO_LOGGER.critical("Cannot parse configuration %s", filepath)
+        for field in CONFIG_RECORD_KINDS.values():
+            for record in config.get(field, []):
+                yield field, record
+        return
+
+    if config_format == CONFIG_FORMAT_JSONL:
+        with open(filepath, "r", encoding="utf-8") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            for record in records:
+                yield from ((CONFIG_RECORD_KINDS[k], v) for k, v in record.items())
+        return
+
+    msgpack = import_msgpack()
+    with open(filepath, "rb") as f:
+        for record in msgpack.Unpacker(f, raw=False):
+            yield from ((CONFIG_RECORD_KINDS[k], v) for k, v in record.items())
+
+def dump_config(config, filepath):
+    """Write a configuration in the format given by the file extension
+
+    Args:
+        config: dict
+            configuration with fields "sources" and "plots"
+        filepath: str
+            where to write to
+    """
+    config_format = get_config_format(filepath)
+    if config_format == CONFIG_FORMAT_JSON:
+        dump_json(config, filepath)
+        return
+
+    records = [{kind: r} for kind, field in CONFIG_RECORD_KINDS.items() for r in config[field]]
+    filepath = expanduser(filepath)
+    if config_format == CONFIG_FORMAT_JSONL:
+        with open(filepath, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")))
+                f.write("\n")
+        return
+
+    msgpack = import_msgpack()
+    packer = msgpack.Packer()
+    with open(filepath, "wb") as f:
+        for record in records:
+            f.write(packer.pack(record))
+
 def make_dir(name):
     if exists(name):
         if not isdir(name):
             IO_LOGGER.critical("There seems to exist a file which has the same name as your chosen output directory %s. Cannot proceed", name)
         return
     makedirs(name)
+
+def file_stamp(filepath):
+    """Cheap fingerprint of a file's state
+
+    Returns:
+        tuple: absolute path, modification time in ns and size or None if file does not exist
+    """
+    filepath = abspath(expanduser(filepath))
+    if not isfile(filepath):
+        return None
+    stat_result = stat(filepath)
+    return filepath, stat_result.st_mtime_ns, stat_result.st_size
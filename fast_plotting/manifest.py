@@ -0,0 +1,97 @@
+"""Keep track of what has been plotted
+
+A manifest in the output directory maps each output file to a fingerprint of everything the plot
+was derived from. Plots whose fingerprint is unchanged and whose output exists can be skipped.
+"""
+
+from os.path import join, isfile
+from hashlib import sha1
+import json
+
+from fast_plotting import __version__
+from fast_plotting.io import parse_json, dump_json, file_stamp
+
+MANIFEST_NAME = ".fast_plotting_manifest.json"
+
+
+def fingerprint(batch, sources, settings=None):
+    """Fingerprint of a plot batch
+
+    Args:
+        batch: dict
+            the plot batch
+        sources: dict
+            source batches by identifier
+        settings: dict (optional)
+            effective render settings of the batch, e.g. engine and resolution
+    Returns:
+        str: hash of the plot batch, its sources including the state of their files, the render settings
+        and the package version
+    """
+    batch_sources = []
+    for identifier in sorted({o["identifier"] for o in batch["objects"]}):
+        source = sources.get(identifier, {})
+        stamp = file_stamp(source["filepath"]) if "filepath" in source else None
+        batch_sources.append((source, stamp))
+    to_hash = {"batch": batch, "sources": batch_sources, "settings": settings, "version": __version__}
+    return sha1(json.dumps(to_hash, sort_keys=True).encode()).hexdigest()
+
+def read_manifest(out_dir):
+    """Read the manifest from an output directory
+
+    Returns:
+        dict: output paths mapped to fingerprints
+    """
+    path = join(out_dir, MANIFEST_NAME)
+    if not isfile(path):
+        return {}
+    return parse_json(path) or {}
+
+def write_manifest(out_dir, manifest):
+    """Write the manifest to an output directory"""
+    dump_json(manifest, join(out_dir, MANIFEST_NAME))
+
+def iter_changed(batches, sources, out_dir, manifest, fingerprints, get_settings=None):
+    """Yield batches which need to be plotted
+
+    Args:
+        batches: iterable
+            plot batches, can be a generator
+        sources: dict
+            source batches by identifier
+        out_dir: str
+            output directory
+        manifest: dict
+            output paths mapped to fingerprints from a previous run
+        fingerprints: dict
+            filled with the new fingerprints of yielded batches by output path
+        get_settings: callable (optional)
+            returns the effective render settings of a batch, changing them requires plotting again
+    """
+    for b in batches:
+        fp = fingerprint(b, sources, get_settings(b) if get_settings else None)
+        if manifest.get(b["output"]) == fp and isfile(join(out_dir, b["output"])):
+            continue
+        fingerprints[b["output"]] = fp
+        yield b
+
+def filter_unchanged(batches, sources, out_dir, manifest, get_settings=None):
+    """Find batches which need to be plotted
+
+    Args:
+        batches: iterable
+            plot batches
+        sources: dict
+            source batches by identifier
+        out_dir: str
+            output directory
+        manifest: dict
+            output paths mapped to fingerprints from a previous run
+        get_settings: callable (optional)
+            returns the effective render settings of a batch
+    Returns:
+        list, dict: batches to be plotted and their new fingerprints by output path
+    """
+    fingerprints = {}
+    changed = list(iter_changed(batches, sources, out_dir, manifest, fingerprints, get_settings))
+    return changed, fingerprints
@@ -0,0 +1,124 @@
+"""Overlap loading, rendering and writing of plots
+
+Data of upcoming batches is loaded in a background thread while the current batch is rendered,
+and encoding and writing of rendered images happens in another background thread. Both are
+bounded so that only a limited number of batches is loaded ahead and a limited number of images
+waits to be written.
+"""
+
+from os.path import splitext
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Thread
+from traceback import format_exc
+
+from matplotlib.image import imsave
+
+from fast_plotting.logger import get_logger
+
+PIPELINE_LOGGER = get_logger("Pipeline")
+
+# formats which can be written from a rendered RGBA buffer, others need to be saved by matplotlib
+BUFFER_FORMATS = (".png", ".raw", ".rgba")
+
+
+def write_image(save_path, rgba, dpi, compress_level=None):
+    """Encode and write a rendered RGBA buffer
+
+    PNGs are written the same way matplotlib does after drawing the canvas, raw images are
+    just the bytes of the buffer.
+
+    Args:
+        save_path: str
+            where to write to, the format is given by the extension, see BUFFER_FORMATS
+        rgba: numpy.ndarray
+            the rendered image
+        dpi: float
+            resolution to be stored with the image
+        compress_level: int (optional)
+            zlib compression level of PNGs from 0 (none) to 9, default of PIL if None
+    """
+    if splitext(save_path)[1].lower() != ".png":
+        rgba.tofile(save_path)
+        return
+    pil_kwargs = {"compress_level": compress_level} if compress_level is not None else None
+    imsave(save_path, rgba, format="png", origin="upper", dpi=dpi, pil_kwargs=pil_kwargs)
+
+def prefetch(batches, window, acquire):
+    """Acquire the data of batches ahead of time
+
+    Data is acquired in one background thread, hence sources are never read concurrently.
+
+    Args:
+        batches: iterable
+            plot batches, can be a generator
+        window: int
+            maximum number of batches acquired ahead of the one being yielded
+        acquire: callable
+            called with a batch to load everything it needs
+    Yields:
+        dict: batches whose data has been acquired, in the original order
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = deque()
+        for b in batches:
+            pending.append((b, executor.submit(acquire, b)))
+            if len(pending) <= window:
+                continue
+            b_ready, future = pending.popleft()
+            # re-raises what happened while acquiring
+            future.result()
+            yield b_ready
+        while pending:
+            b_ready, future = pending.popleft()
+            future.result()
+            yield b_ready
+
+class ImageWriter:
+    """Encode and write rendered images in a background thread"""
+
+    def __init__(self, max_pending=2):
+        """init
+
+        Args:
+            max_pending: int
+                maximum number of images waiting to be written, submitting blocks beyond that
+        """
+        self.queue = Queue(max_pending)
+        # output paths mapped to what went wrong
+        self.errors = {}
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def run(self):
+        """Write images until None is received"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                write_image(*item)
+            except Exception: # pylint: disable=broad-except
+                self.errors[item[0]] = format_exc()
+
+    def submit(self, save_path, rgba, dpi, compress_level=None):
+        """Queue an image to be written, see write_image
+
+        The rendered image must not be changed afterwards.
+        """
+        self.queue.put((save_path, rgba, dpi, compress_level))
+
+    def close(self):
+        """Wait until everything has been written"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        for save_path, error in self.errors.items():
+            PIPELINE_LOGGER.error("Failed to write %s\n%s", save_path, error)
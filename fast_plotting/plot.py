@@ -1,12 +1,31 @@
 """Plotting classes and functionality"""
 
 from math import sqrt, ceil
-from os.path import join
+from contextlib import nullcontext
+from os.path import join, splitext
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from traceback import format_exc
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.cbook import pts_to_midstep
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
 
-from fast_plotting.registry import get_from_registry
+from fast_plotting.registry import get_from_registry, add_to_registry, clear_registry, remove_from_registry, register_sources
+from fast_plotting.registry import count_references, load_into_registry, pin_in_registry, unpin_in_registry, attach_store, get_store
+from fast_plotting.store import DataStore
+from fast_plotting.schedule import schedule_batches, estimate_peak, estimate_sizes
+from fast_plotting.manifest import read_manifest, write_manifest, filter_unchanged, iter_changed
+from fast_plotting.figure_pool import FigurePool
+# generating plots does not need matplotlib, they are still available from here as they used to be
+from fast_plotting.config import add_plot_for_each_source, add_overlay_plot_for_sources # pylint: disable=unused-import
+from fast_plotting.downsample import downsample
+from fast_plotting.summary import make_page_batches, make_thumbnail_batches, write_gallery, SUMMARY_NAME, THUMBNAIL_DIR, GALLERY_INDEX
+from fast_plotting.pipeline import prefetch, ImageWriter, write_image, BUFFER_FORMATS
+from fast_plotting.profiling import profiled, ProfileStage
 from fast_plotting.logger import get_logger
-from fast_plotting.io import parse_json, make_dir
+from fast_plotting.io import make_dir
 
 PLOT_LOGGER = get_logger("Plot")
 
@@ -16,6 +35,30 @@ PLOT_TYPE_LINE = "line"
 PLOT_TYPE_STEP = "step"
 PLOT_TYPES = (PLOT_TYPE_BAR, PLOT_TYPE_SCATTER, PLOT_TYPE_LINE, PLOT_TYPE_STEP)
 
+# the default engine going through the full pyplot interface
+RENDER_ENGINE_DEFAULT = "default"
+# draw each object as a single collection from precomputed vertices, no tight layout
+RENDER_ENGINE_FAST = "fast"
+RENDER_ENGINES = (RENDER_ENGINE_DEFAULT, RENDER_ENGINE_FAST)
+# fixed margins used by the fast engine instead of tight_layout
+FAST_ENGINE_MARGINS = {"left": 0.1, "bottom": 0.07, "right": 0.98, "top": 0.96}
+
+# global settings for rendering, engine, dpi and compress_level can be overridden per plot
+RENDER_SETTINGS = {"engine": RENDER_ENGINE_DEFAULT,
+                   # series with more points are downsampled, 0 to disable
+                   "downsample_threshold": 10000,
+                   # resolution of saved images, None to use the one of matplotlib
+                   "dpi": None,
+                   # zlib compression level of PNGs from 0 (fastest) to 9 (smallest), None to use the one of PIL
+                   "compress_level": None,
+                   # file format replacing the one of all outputs, e.g. "pdf" or "raw", None to keep the configured ones
+                   "format": None,
+                   # render everything but do not write any image
+                   "dry_run": False}
+
+# pool to recycle figures, None if figures should not be recycled
+FIGURE_POOL = {"pool": None}
+
 
 def finalise_label(label):
     """Wrapper to adjust label text if necessary"""
@@ -24,12 +67,108 @@ def finalise_label(label):
     label = label.replace("#", "")
     return label
 
-def plot_single_1d(x, y, label, ax, plot_type=PLOT_TYPE_STEP, xerr=None, yerr=None):
+def configure_rendering(**kwargs):
+    """Change global render settings
+
+    Args:
+        kwargs: dict
+            engine: str
+                one of RENDER_ENGINES
+            downsample_threshold: int
+                series with more points are reduced to what can be resolved, 0 to disable
+            dpi: float
+                resolution of saved images
+            compress_level: int
+                zlib compression level of PNGs from 0 to 9
+            format: str
+                file format replacing the one of all outputs
+            dry_run: bool
+                render everything but do not write any image
+    """
+    engine = kwargs.get("engine", RENDER_SETTINGS["engine"])
+    if engine not in RENDER_ENGINES:
+        PLOT_LOGGER.critical("Unknown render engine %s", engine)
+    compress_level = kwargs.get("compress_level", RENDER_SETTINGS["compress_level"])
+    if compress_level is not None and not 0 <= compress_level <= 9:
+        PLOT_LOGGER.critical("PNG compression level must be between 0 and 9, got %d", compress_level)
+    RENDER_SETTINGS.update(kwargs)
+
+def get_engine(config_batch):
+    """Render engine to be used for a batch"""
+    return config_batch.get("engine", RENDER_SETTINGS["engine"])
+
+def get_output_settings(config_batch):
+    """Resolution and PNG compression level of the image of a batch"""
+    return config_batch.get("dpi", RENDER_SETTINGS["dpi"]), config_batch.get("compress_level", RENDER_SETTINGS["compress_level"])
+
+def get_render_settings(config_batch):
+    """Everything besides the batch itself which changes how the batch is rendered and saved"""
+    dpi, compress_level = get_output_settings(config_batch)
+    return {"engine": get_engine(config_batch), "downsample_threshold": get_downsample_threshold(config_batch),
+            "dpi": dpi, "compress_level": compress_level, "format": RENDER_SETTINGS["format"]}
+
+def apply_output_format(config_batch):
+    """Batch whose output has the globally requested format, the batch itself if there is none"""
+    output_format = RENDER_SETTINGS["format"]
+    if not output_format:
+        return config_batch
+    return {**config_batch, "output": f"{splitext(config_batch['output'])[0]}.{output_format}"}
+
+def get_downsample_threshold(config_batch):
+    """Number of points above which series of a batch are downsampled
+
+    The batch can set "downsample" to true (always), false (never) or a number of points
+    """
+    threshold = config_batch.get("downsample", RENDER_SETTINGS["downsample_threshold"])
+    if threshold is True:
+        return 0
+    if not threshold:
+        return None
+    return threshold
+
+def plot_single_1d_fast(x, y, label, ax, plot_type=PLOT_TYPE_STEP, xerr=None, yerr=None, color="C0"):
+    """Put a single object on axes with as few artists as possible"""
+    if plot_type == PLOT_TYPE_BAR:
+        width = (max(x) - min(x)) / len(x)
+        left = x - 0.5 * width
+        right = x + 0.5 * width
+        bottom = np.zeros_like(y)
+        verts = np.stack([np.column_stack(c) for c in ((left, bottom), (left, y), (right, y), (right, bottom))], axis=1)
+        collection = PolyCollection(verts, alpha=0.4, facecolors=color, label=label)
+    elif plot_type == PLOT_TYPE_SCATTER:
+        fig = ax.get_figure()
+        marker_sizes = fig.get_size_inches() * fig.dpi * 0.1
+        ax.scatter(x, y, label=label, s=sqrt(marker_sizes[0]**2 + marker_sizes[1]**2), c=color)
+        segments = []
+        if yerr is not None:
+            yerr = np.broadcast_to(yerr, (2, len(y)))
+            segments.append(np.stack((np.column_stack((x, y - yerr[0])), np.column_stack((x, y + yerr[1]))), axis=1))
+        if xerr is not None:
+            xerr = np.broadcast_to(xerr, (2, len(x)))
+            segments.append(np.stack((np.column_stack((x - xerr[0], y)), np.column_stack((x + xerr[1], y))), axis=1))
+        if not segments:
+            return
+        collection = LineCollection(np.concatenate(segments), linewidths=3, colors=color)
+    elif plot_type == PLOT_TYPE_LINE:
+        collection = LineCollection([np.column_stack((x, y))], alpha=0.4, colors=color, label=label)
+    elif plot_type == PLOT_TYPE_STEP:
+        collection = LineCollection([pts_to_midstep(x, y).T], linewidths=2, colors=color, label=label)
+    else:
+        PLOT_LOGGER.error("Cannot handle plot type %s", plot_type)
+        return
+    ax.add_collection(collection, autolim=True)
+
+@profiled("plot_single_1d")
+def plot_single_1d(x, y, label, ax, plot_type=PLOT_TYPE_STEP, xerr=None, yerr=None, engine=RENDER_ENGINE_DEFAULT, color=None):
     """Put a single object on axes"""
     if plot_type not in PLOT_TYPES:
         PLOT_LOGGER.error("Cannot handle plot type %s", plot_type)
         return
 
+    if engine == RENDER_ENGINE_FAST:
+        plot_single_1d_fast(x, y, label, ax, plot_type, xerr=xerr, yerr=yerr, color=color or "C0")
+        return
+
     if plot_type == PLOT_TYPE_BAR:
         range_x = max(x) - min(x)
         width = range_x / len(x)
@@ -47,18 +186,118 @@ def plot_single_1d(x, y, label, ax, plot_type=PLOT_TYPE_STEP, xerr=None, yerr=No
     elif plot_type == PLOT_TYPE_STEP:
         ax.step(x, y, where="mid", label=label, lw=2)
 
-def finalise_figure(figure, save_path):
+def enable_figure_pool(max_size=2):
+    """Recycle figures of single plots
+
+    Args:
+        max_size: int
+            maximum number of idle figures to keep, 0 disables recycling
+    """
+    if FIGURE_POOL["pool"]:
+        FIGURE_POOL["pool"].close()
+    FIGURE_POOL["pool"] = FigurePool(max_size) if max_size > 0 else None
+
+@profiled("make_axes")
+def make_axes(figsize):
+    """Make new axes, potentially on a recycled figure"""
+    if FIGURE_POOL["pool"]:
+        return FIGURE_POOL["pool"].get_axes(figsize)
+    _, ax = plt.subplots(figsize=figsize)
+    return ax
+
+def render_rgba(figure, dpi):
+    """Draw a figure on its Agg canvas at the given resolution
+
+    Returns:
+        numpy.ndarray: copy of the RGBA buffer, the buffer itself is reused when the figure is drawn again
+    """
+    figure_dpi = figure.dpi
+    figure.dpi = dpi
+    try:
+        figure.canvas.draw()
+        return np.array(figure.canvas.buffer_rgba())
+    finally:
+        # recycled figures must keep their original size
+        figure.dpi = figure_dpi
+
+def save_figure(figure, save_path, writer=None, dpi=None, compress_level=None):
+    """Save a figure
+
+    PNGs and raw RGBA images are rendered here from where they are either written directly or, if
+    a writer is given, encoded and written by the writer. Everything else is saved by matplotlib.
+
+    Args:
+        figure: Figure
+        save_path: str
+        writer: fast_plotting.pipeline.ImageWriter (optional)
+        dpi: float (optional)
+            resolution, savefig.dpi of matplotlib if None
+        compress_level: int (optional)
+            zlib compression level of PNGs from 0 to 9
+    """
+    if RENDER_SETTINGS["dry_run"]:
+        # render everything but do not keep or write anything
+        with ProfileStage("draw"):
+            figure.canvas.draw()
+        return
+    if dpi is None:
+        dpi = plt.rcParams["savefig.dpi"]
+        if dpi == "figure":
+            dpi = figure.dpi
+    extension = splitext(save_path)[1].lower()
+    if not isinstance(figure.canvas, FigureCanvasAgg) or extension not in BUFFER_FORMATS \
+            or (writer is None and extension == ".png"):
+        # other formats do not accept options for PIL
+        kwargs = {"pil_kwargs": {"compress_level": compress_level}} if compress_level is not None and extension == ".png" else {}
+        with ProfileStage("savefig"):
+            figure.savefig(save_path, dpi=dpi, **kwargs)
+        return
+    with ProfileStage("draw"):
+        rgba = render_rgba(figure, dpi)
+    if writer is None:
+        with ProfileStage("write_image"):
+            write_image(save_path, rgba, dpi, compress_level)
+        return
+    writer.submit(save_path, rgba, dpi, compress_level)
+
+@profiled("finalise_figure")
+def finalise_figure(figure, save_path, tight_layout=True, writer=None, dpi=None, compress_level=None):
     """Wrapper to save and close figure
 
     Args:
         figure: Figure
         save_path: str
+        tight_layout: bool
+            whether or not to adjust the layout before saving
+        writer: fast_plotting.pipeline.ImageWriter (optional)
+            to encode and write the image in the background
+        dpi: float (optional)
+            resolution of the image, the global one if None
+        compress_level: int (optional)
+            zlib compression level of PNGs, the global one if None
     """
-    figure.tight_layout()
-    figure.savefig(save_path)
-    plt.close(figure)
+    dpi = dpi if dpi is not None else RENDER_SETTINGS["dpi"]
+    compress_level = compress_level if compress_level is not None else RENDER_SETTINGS["compress_level"]
+    pool = FIGURE_POOL["pool"]
+    if pool and pool.owns(figure):
+        if tight_layout:
+            with ProfileStage("tight_layout"):
+                pool.layout(figure)
+        save_figure(figure, save_path, writer, dpi, compress_level)
+        pool.release(figure)
+    else:
+        if tight_layout:
+            with ProfileStage("tight_layout"):
+                figure.tight_layout()
+        save_figure(figure, save_path, writer, dpi, compress_level)
+        plt.close(figure)
     PLOT_LOGGER.debug("Plotted at %s", save_path)
 
+def finalise_batch_figure(figure, config_batch, save_path, writer=None):
+    """Save and close the figure of a batch according to its render and output settings"""
+    finalise_figure(figure, save_path, get_engine(config_batch) != RENDER_ENGINE_FAST, writer, *get_output_settings(config_batch))
+
+@profiled("plot_single")
 def plot_single(config_batch, ax=None):
     """Plot from a config batch
 
@@ -68,23 +307,34 @@ def plot_single(config_batch, ax=None):
     """
     if not ax:
         # make new axes if needed
-        _, ax = plt.subplots(figsize=(30, 30))
+        ax = make_axes((30, 30))
     figure = ax.get_figure()
+    engine = get_engine(config_batch)
+    downsample_threshold = get_downsample_threshold(config_batch)
 
-    for plot_object in config_batch["objects"]:
+    for i, plot_object in enumerate(config_batch["objects"]):
         data_wrapper = get_from_registry(plot_object["identifier"])
         data = data_wrapper.data
-        uncertainties = data_wrapper.uncertainties
         data_annotations = data_wrapper.data_annotations
         # TODO Really only 1d data at the moment
         x = data[:,0]
         y = data[:,1]
-        xerr, yerr = (None, None)
-        if uncertainties is not None:
-            xerr = uncertainties[:,0,:].T
-            yerr = uncertainties[:,1,:].T
+        # avoid expanding compactly stored uncertainties
+        xerr = data_wrapper.get_errors(0)
+        yerr = data_wrapper.get_errors(1)
         plot_type = plot_object.get("type", PLOT_TYPE_STEP)
-        plot_single_1d(x, y, plot_object.get("label", "label"), ax, plot_type, xerr=xerr, yerr=yerr)
+        if downsample_threshold is not None and len(x) > downsample_threshold:
+            # no need for more points than pixels
+            n_pixels = int(ax.get_window_extent().width)
+            if len(x) > 2 * n_pixels:
+                x, y, xerr, yerr = downsample(x, y, plot_type, n_pixels, xerr, yerr)
+        plot_single_1d(x, y, plot_object.get("label", "label"), ax, plot_type, xerr=xerr, yerr=yerr, engine=engine, color=f"C{i}")
+
+    if engine == RENDER_ENGINE_FAST:
+        # collections were added without scaling the view
+        ax.autoscale_view()
+        if len(figure.get_axes()) == 1:
+            figure.subplots_adjust(**FAST_ENGINE_MARGINS)
 
     ax.legend(loc="best", fontsize=30)
 
@@ -95,9 +345,16 @@ def plot_single(config_batch, ax=None):
 
     return figure, ax
 
-def plot_all_in_one(batches):
-    """Plot all given batches into 1 figure"""
-    n_axes_cols_rows = ceil(sqrt(len(batches)))
+def plot_all_in_one(batches, n_cells=None):
+    """Plot all given batches into 1 figure
+
+    Args:
+        batches: list
+            plot batches
+        n_cells: int (optional)
+            minimum number of cells of the grid, number of batches if None
+    """
+    n_axes_cols_rows = ceil(sqrt(max(len(batches), n_cells or 0)))
     figure, axes = plt.subplots(n_axes_cols_rows, n_axes_cols_rows, figsize=(40, 40))
     axes = axes.flatten()
     turn_off_axes = 0
@@ -109,6 +366,12 @@ def plot_all_in_one(batches):
             axes[i].axis("off")
     return figure
 
+def plot_batch(config_batch):
+    """Figure of a batch, a summary page if the batch holds one"""
+    if "page" in config_batch:
+        return plot_all_in_one(config_batch["page"], config_batch["page_size"])
+    return plot_single(config_batch)[0]
+
 def plot_impl(batches, all_in_one=False):
     """Actual implementation of plotting
 
@@ -118,9 +381,286 @@ def plot_impl(batches, all_in_one=False):
         for b in batches:
             yield plot_single(b)[0], b["output"]
     else:
-        yield plot_all_in_one(batches), "summary.png"
+        yield plot_all_in_one(batches), f"{SUMMARY_NAME}.{RENDER_SETTINGS['format'] or 'png'}"
+
+def init_worker(figure_pool_size=0, render_settings=None, store_path=None):
+    """Initialise a worker process used for parallel plotting"""
+    # workers never show anything, so stick to the non-interactive backend
+    plt.switch_backend("Agg")
+    enable_figure_pool(figure_pool_size)
+    configure_rendering(**(render_settings or {}))
+    # do not carry over anything the parent might have registered already
+    clear_registry()
+    # data in a store is shared via memory mapping instead of being sent
+    attach_store(DataStore(store_path) if store_path else None)
+
+def plot_worker(batch, data_wrappers, save_path):
+    """Plot and save a single batch inside a worker process
+
+    Args:
+        batch: dict
+            dictionary containing all info for plot
+        data_wrappers: dict
+            identifiers mapped to the DataWrapper objects needed by this batch
+        save_path: str
+            where to save the figure
+    Returns:
+        str or None: error message if something went wrong, None otherwise
+    """
+    try:
+        for identifier, data_wrapper in data_wrappers.items():
+            add_to_registry(identifier, data_wrapper)
+        finalise_batch_figure(plot_batch(batch), batch, save_path)
+    except (Exception, SystemExit): # pylint: disable=broad-except
+        return format_exc()
+    finally:
+        clear_registry()
+    return None
+
+class DataStreamer:
+    """Make sure data is there when a batch is plotted and is released afterwards
+
+    Data is loaded right before a batch needs it and removed from the registry as soon as no later
+    batch references it any more. Hence, memory is bounded by what is needed at the same time rather
+    than by everything in the configuration.
+    """
 
-def plot(config, out_dir="./", all_in_one=False):
+    def __init__(self, config, batches=None):
+        """init
+
+        Args:
+            config: ConfigInterface
+                configuration holding the sources
+            batches: iterable (optional)
+                all plot batches to be streamed, if not given data is only loaded on demand but never released
+        """
+        register_sources(config.get_sources())
+        self.references = count_references(batches) if batches is not None else None
+
+    def acquire(self, batch):
+        """Load everything a batch needs and protect it from being evicted"""
+        identifiers = [o["identifier"] for o in batch["objects"]]
+        pin_in_registry(identifiers)
+        load_into_registry(identifiers)
+
+    def release(self, batch):
+        """Release everything a batch needed and which is not referenced anymore"""
+        identifiers = [o["identifier"] for o in batch["objects"]]
+        unpin_in_registry(identifiers)
+        if self.references is None:
+            return
+        for identifier in identifiers:
+            self.references[identifier] -= 1
+            if not self.references[identifier]:
+                remove_from_registry(identifier)
+
+def collect_failed(futures, failed):
+    """Check finished futures of parallel plotting and collect failed output paths"""
+    for future, save_path in futures.items():
+        try:
+            error = future.result()
+        except Exception as e: # pylint: disable=broad-except
+            # for instance, the worker process died unexpectedly
+            error = str(e)
+        if error:
+            PLOT_LOGGER.error("Failed to plot %s\n%s", save_path, error)
+            failed.append(save_path)
+
+def plot_parallel(batches, out_dir, jobs, streamer=None):
+    """Distribute batches to a pool of worker processes
+
+    Args:
+        batches: iterable
+            config batches to be plotted
+        out_dir: str
+            desired output directory
+        jobs: int
+            number of worker processes
+        streamer: DataStreamer (optional)
+            load data on demand and release it once submitted
+    Returns:
+        list: output paths which could not be plotted
+    """
+    failed = []
+    # limit the number of pending plots so that not all data is waiting to be sent at the same time
+    max_pending = 2 * jobs
+    figure_pool_size = FIGURE_POOL["pool"].max_size if FIGURE_POOL["pool"] else 0
+    store = get_store()
+    store_path = store.path if store else None
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(figure_pool_size, dict(RENDER_SETTINGS), store_path)) as executor:
+        pending = {}
+        for b in batches:
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect_failed({f: pending.pop(f) for f in done}, failed)
+            if streamer:
+                streamer.acquire(b)
+            # only ship what this batch actually needs and what workers cannot take from the store
+            data_wrappers = {o["identifier"]: get_from_registry(o["identifier"]) for o in b["objects"]
+                             if store is None or o["identifier"] not in store}
+            save_path = join(out_dir, b["output"])
+            pending[executor.submit(plot_worker, b, data_wrappers, save_path)] = save_path
+            if streamer:
+                streamer.release(b)
+            del data_wrappers
+        wait(pending)
+        collect_failed(pending, failed)
+    return failed
+
+def plot_serial(batches, out_dir, streamer=None, prefetch_window=0):
+    """Plot batches one after another
+
+    Args:
+        batches: iterable
+            config batches to be plotted
+        out_dir: str
+            desired output directory
+        streamer: DataStreamer (optional)
+            load data on demand and release it when not needed anymore
+        prefetch_window: int
+            if > 0, data of this many batches is loaded ahead in the background and images are written in the background
+    Returns:
+        list: output paths which could not be written
+    """
+    writer = None
+    if prefetch_window:
+        writer = ImageWriter()
+        if streamer:
+            batches = prefetch(batches, prefetch_window, streamer.acquire)
+    try:
+        for b in batches:
+            if streamer and not prefetch_window:
+                streamer.acquire(b)
+            finalise_batch_figure(plot_batch(b), b, join(out_dir, b["output"]), writer)
+            if streamer:
+                streamer.release(b)
+    finally:
+        if writer:
+            writer.close()
+    return list(writer.errors) if writer else []
+
+def plot_batches(config, batches, out_dir, jobs=1, stream=False, prefetch_window=0):
+    """Plot each batch into its own figure
+
+    Args:
+        config: ConfigInterface
+            configuration holding the sources
+        batches: iterable
+            plot batches
+        out_dir: str
+            desired output directory
+        jobs: int
+            number of parallel processes to plot single figures
+        stream: bool
+            load data only right before it is needed and release it when it is not needed anymore
+        prefetch_window: int
+            when plotting in one process, load data of this many batches ahead in the background
+    Returns:
+        list: output paths which could not be plotted
+    """
+    streamer = None
+    if stream:
+        # order such that shared data can be released as early as possible
+        sizes = estimate_sizes(batches, config.get_source_index())
+        peak_before = estimate_peak(batches, sizes)
+        batches = schedule_batches(batches)
+        PLOT_LOGGER.info("At most about %.1f MB of data loaded at the same time (%.1f MB without scheduling)",
+                         estimate_peak(batches, sizes) / 1024**2, peak_before / 1024**2)
+        streamer = DataStreamer(config, batches)
+    elif prefetch_window and jobs == 1:
+        # data is loaded in the background when needed
+        streamer = DataStreamer(config)
+    if jobs > 1:
+        return plot_parallel(batches, out_dir, jobs, streamer)
+    return plot_serial(batches, out_dir, streamer, prefetch_window)
+
+def plot_pdf(config, pages, save_path, stream=False):
+    """Plot summary pages into one multi-page PDF
+
+    Pages are written one after another since they go into the same file.
+
+    Args:
+        config: ConfigInterface
+            configuration holding the sources
+        pages: list
+            page batches, see fast_plotting.summary.make_page_batches
+        save_path: str
+            where to save the PDF
+        stream: bool
+            load data only right before it is needed and release it when it is not needed anymore
+    """
+    streamer = DataStreamer(config, pages) if stream else None
+    with nullcontext() if RENDER_SETTINGS["dry_run"] else PdfPages(save_path) as pdf:
+        for page in pages:
+            if streamer:
+                streamer.acquire(page)
+            figure = plot_batch(page)
+            with ProfileStage("tight_layout"):
+                figure.tight_layout()
+            with ProfileStage("savefig"):
+                if pdf:
+                    pdf.savefig(figure)
+                else:
+                    figure.canvas.draw()
+            plt.close(figure)
+            if streamer:
+                streamer.release(page)
+    PLOT_LOGGER.debug("Plotted at %s", save_path)
+
+def plot_summary(config, batches, out_dir, jobs=1, stream=False, prefetch_window=0, page_size=0, gallery=False):
+    """Summarise all batches
+
+    By default, everything goes into one figure. Otherwise, summary pages of page_size plots are
+    written as tiles or, for PDF, as one multi-page file. A gallery instead renders a small
+    thumbnail of each batch and writes an HTML index of them.
+
+    Args:
+        config: ConfigInterface
+            configuration holding the sources
+        batches: list
+            plot batches
+        out_dir: str
+            desired output directory
+        jobs: int
+            number of parallel processes to plot tiles or thumbnails
+        stream: bool
+            load data only right before it is needed and release it when it is not needed anymore
+        prefetch_window: int
+            when plotting in one process, load data of this many batches ahead in the background
+        page_size: int
+            maximum number of plots per page, everything goes on one page if 0
+        gallery: bool
+            write thumbnails and an HTML index instead of pages
+    Returns:
+        list: output paths which could not be plotted
+    """
+    if gallery:
+        thumbnails = make_thumbnail_batches(batches, RENDER_ENGINE_FAST)
+        make_dir(join(out_dir, THUMBNAIL_DIR))
+        failed = plot_batches(config, thumbnails, out_dir, jobs, stream, prefetch_window)
+        if not RENDER_SETTINGS["dry_run"]:
+            write_gallery(join(out_dir, GALLERY_INDEX), batches, thumbnails)
+        return failed
+
+    output_format = RENDER_SETTINGS["format"] or "png"
+    if page_size and output_format == "pdf":
+        plot_pdf(config, make_page_batches(batches, page_size, output_format), join(out_dir, f"{SUMMARY_NAME}.pdf"), stream)
+        return []
+    if page_size:
+        return plot_batches(config, make_page_batches(batches, page_size, output_format), out_dir, jobs, stream, prefetch_window)
+
+    if stream:
+        # everything is needed at the same time anyway
+        streamer = DataStreamer(config, batches)
+        for b in batches:
+            streamer.acquire(b)
+    for figure, save_path in plot_impl(batches, True):
+        finalise_figure(figure, join(out_dir, save_path))
+    return []
+
+def plot(config, out_dir="./", all_in_one=False, jobs=1, stream=False, force=False, prefetch_window=0, page_size=0, gallery=False,
+         lazy=False):
     """Read from a JSON config
 
     Args:
@@ -129,29 +669,103 @@ def plot(config, out_dir="./", all_in_one=False):
         out_dir: str
             desired output directory
         all_in_one: bool
-            whether or not to throw everything into one summary figure
+            whether or not to make a summary of everything instead of single figures
+        jobs: int
+            number of parallel processes to plot single figures
+        stream: bool
+            load data only right before it is needed and release it when it is not needed anymore
+        force: bool
+            plot everything, even if nothing changed since the figure was plotted last time
+        prefetch_window: int
+            when plotting in one process, load data of this many batches ahead in the background
+        page_size: int
+            maximum number of plots per summary page, see plot_summary
+        gallery: bool
+            summarise as thumbnails with an HTML index, see plot_summary
+        lazy: bool
+            load data only when a plot needs it instead of all data of the plots to be rendered at once
+    Returns:
+        list: output paths which could not be plotted
     """
-    batches = [b for b in config.get_plots() if b["enable"]]
+    batches = [apply_output_format(b) for b in config.get_plots() if b["enable"]]
     if not batches:
         # just return if nothing to plot
-        return
+        return []
+    # data is loaded from the sources on demand
+    register_sources(config.get_sources())
     make_dir(out_dir)
-    for figure, save_path in plot_impl(batches, all_in_one):
-        finalise_figure(figure, join(out_dir, save_path))
 
-def add_plot_for_each_source(config):
-    """Add a plot dictionary for each source automatically"""
-    for s in config.get_sources():
-        config.add_plot(identifier=s["identifier"], objects=[{"identifier": s["identifier"], "type": PLOT_TYPE_STEP, "label": s.get("label", "")}], title=s["identifier"], enable=False, output=f"{s['identifier']}.png")
-
-def add_overlay_plot_for_sources(config):
-    """Make overlay plots if possible"""
-    objects = {}
-    for s in config.get_sources():
-        identifier = s["identifier"]
-        identifier_key = "_".join(identifier.split("_")[:-1])
-        if identifier_key not in objects:
-            objects[identifier_key] = []
-        objects[identifier_key].append({"identifier": identifier, "type": PLOT_TYPE_STEP, "label": s.get("label", "")})
-    for k, o in objects.items():
-        config.add_plot(identifier=k, objects=o, title=k, enable=False, output=f"{k}.png")
+    if all_in_one:
+        if not (stream or lazy):
+            load_into_registry(count_references(batches))
+        return plot_summary(config, batches, out_dir, jobs, stream, prefetch_window, page_size, gallery)
+
+    # only plot what has changed since last time
+    sources = config.get_source_index()
+    manifest = read_manifest(out_dir)
+    n_enabled = len(batches)
+    batches, fingerprints = filter_unchanged(batches, sources, out_dir, {} if force else manifest, get_render_settings)
+    PLOT_LOGGER.info("Rendering %d plot(s), skipping %d unchanged plot(s)", len(batches), n_enabled - len(batches))
+    if not batches:
+        return []
+
+    if not (stream or lazy):
+        # only now, so that nothing is loaded for unchanged plots
+        load_into_registry(count_references(batches))
+    failed = plot_batches(config, batches, out_dir, jobs, stream, prefetch_window)
+    if RENDER_SETTINGS["dry_run"]:
+        # nothing has been written
+        return failed
+
+    for output, fp in fingerprints.items():
+        if join(out_dir, output) not in failed:
+            manifest[output] = fp
+    write_manifest(out_dir, manifest)
+    return failed
+
+def plot_incremental(config, path, out_dir="./", jobs=1, force=False, prefetch_window=0):
+    """Plot while a configuration is read record by record
+
+    Each enabled plot is rendered as soon as it has been read, data is loaded on demand.
+
+    Args:
+        config: ConfigInterface
+            configuration to read into
+        path: str
+            path to a JSON Lines or msgpack configuration
+        out_dir: str
+            desired output directory
+        jobs: int
+            number of parallel processes to plot single figures
+        force: bool
+            plot everything, even if nothing changed since the figure was plotted last time
+        prefetch_window: int
+            when plotting in one process, load data of this many batches ahead in the background
+    Returns:
+        list: output paths which could not be plotted
+    """
+    make_dir(out_dir)
+    manifest = read_manifest(out_dir)
+    fingerprints = {}
+    counts = {"enabled": 0}
+
+    def enabled_batches():
+        for b in config.iter_read(path):
+            if not b["enable"]:
+                continue
+            counts["enabled"] += 1
+            # sources always come before the plots using them
+            register_sources(config.get_source(o["identifier"]) for o in b["objects"] if config.get_source(o["identifier"]))
+            yield apply_output_format(b)
+
+    batches = iter_changed(enabled_batches(), config.get_source_index(), out_dir, {} if force else manifest, fingerprints, get_render_settings)
+    failed = plot_batches(config, batches, out_dir, jobs, prefetch_window=prefetch_window)
+    PLOT_LOGGER.info("Rendered %d plot(s), skipped %d unchanged plot(s)", len(fingerprints), counts["enabled"] - len(fingerprints))
+    if RENDER_SETTINGS["dry_run"]:
+        return failed
+
+    for output, fp in fingerprints.items():
+        if join(out_dir, output) not in failed:
+            manifest[output] = fp
+    write_manifest(out_dir, manifest)
+    return failed
@@ -0,0 +1,160 @@
+"""Time and memory instrumentation of processing stages
+
+Stages are marked with the profiled decorator or the ProfileStage context manager. Unless
+profiling is enabled, nothing is recorded and a decorated function only costs one additional
+dictionary lookup. Recorded stages are summarised per name (count, total time, p50/p95 and
+allocated bytes if memory is traced) or written as Chrome trace to be inspected with e.g.
+chrome://tracing or Perfetto.
+
+Only the current process is profiled, stages running in worker processes are not recorded.
+"""
+
+from os import getpid
+from functools import wraps
+from threading import get_ident
+from time import perf_counter
+import tracemalloc
+import json
+
+from fast_plotting.logger import get_logger
+
+PROFILE_LOGGER = get_logger("Profile")
+
+PROFILE_FORMAT_JSON = "json"
+PROFILE_FORMAT_CHROME = "chrome"
+PROFILE_FORMATS = (PROFILE_FORMAT_JSON, PROFILE_FORMAT_CHROME)
+
+# global profiling settings
+PROFILE_SETTINGS = {"enable": False,
+                    # whether allocated memory is traced as well
+                    "memory": False}
+# stage names mapped to lists of durations in s and allocated bytes
+PROFILE_RECORDS = {}
+# every recorded stage as name, start, duration and thread for traces
+PROFILE_EVENTS = []
+
+
+def enable_profiling(memory=False):
+    """Start recording stages
+
+    Args:
+        memory: bool
+            also trace allocated memory, this slows everything down considerably
+    """
+    reset_profiling()
+    PROFILE_SETTINGS["enable"] = True
+    PROFILE_SETTINGS["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable_profiling():
+    """Stop recording stages, recorded stages are kept"""
+    PROFILE_SETTINGS["enable"] = False
+    if PROFILE_SETTINGS["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    PROFILE_SETTINGS["memory"] = False
+
+def reset_profiling():
+    """Forget everything recorded so far"""
+    PROFILE_RECORDS.clear()
+    PROFILE_EVENTS.clear()
+
+def record(name, start, duration, allocated=None):
+    """Record one stage"""
+    durations, allocations = PROFILE_RECORDS.setdefault(name, ([], []))
+    durations.append(duration)
+    if allocated is not None:
+        allocations.append(allocated)
+    PROFILE_EVENTS.append((name, start, duration, get_ident()))
+
+class ProfileStage:
+    """Context manager recording a stage if profiling is enabled"""
+
+    __slots__ = ("name", "start", "memory")
+
+    def __init__(self, name):
+        """init
+
+        Args:
+            name: str
+                name of the stage, all stages of the same name are summarised together
+        """
+        self.name = name
+        self.start = None
+        self.memory = None
+
+    def __enter__(self):
+        if PROFILE_SETTINGS["enable"]:
+            if PROFILE_SETTINGS["memory"]:
+                self.memory = tracemalloc.get_traced_memory()[0]
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self.start is None:
+            return
+        duration = perf_counter() - self.start
+        allocated = tracemalloc.get_traced_memory()[0] - self.memory if self.memory is not None and tracemalloc.is_tracing() else None
+        record(self.name, self.start, duration, allocated)
+        self.start = None
+
+def profiled(name):
+    """Decorator to record each call of a function as stage"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILE_SETTINGS["enable"]:
+                return func(*args, **kwargs)
+            with ProfileStage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def summarise():
+    """Summary of all recorded stages
+
+    Returns:
+        dict: stage names mapped to count, total, p50 and p95 in s and allocated bytes (None if not traced)
+    """
+    summary = {}
+    for name, (durations, allocations) in PROFILE_RECORDS.items():
+        durations = sorted(durations)
+        summary[name] = {"count": len(durations), "total": sum(durations),
+                         "p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95),
+                         "bytes": sum(allocations) if allocations else None}
+    return summary
+
+def print_profile():
+    """Print a breakdown of all recorded stages, most expensive first"""
+    summary = summarise()
+    print(f"{'stage':30} {'count':>8} {'total [s]':>10} {'p50 [ms]':>10} {'p95 [ms]':>10} {'bytes':>14}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        allocated = f"{s['bytes']:14d}" if s["bytes"] is not None else f"{'-':>14}"
+        print(f"{name:30} {s['count']:8d} {s['total']:10.3f} {s['p50'] * 1000:10.3f} {s['p95'] * 1000:10.3f} {allocated}")
+
+def chrome_trace():
+    """All recorded stages in the Chrome trace event format"""
+    pid = getpid()
+    return {"traceEvents": [{"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": pid, "tid": tid}
+                            for name, start, duration, tid in PROFILE_EVENTS],
+            "displayTimeUnit": "ms"}
+
+def write_profile(filepath, profile_format=PROFILE_FORMAT_JSON):
+    """Write recorded stages
+
+    Args:
+        filepath: str
+            where to write to
+        profile_format: str
+            one of PROFILE_FORMATS, the summary as JSON or every single stage as Chrome trace
+    """
+    if profile_format not in PROFILE_FORMATS:
+        PROFILE_LOGGER.critical("Unknown profile format %s", profile_format)
+    to_write = summarise() if profile_format == PROFILE_FORMAT_JSON else chrome_trace()
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(to_write, f, indent=2)
+    PROFILE_LOGGER.info("Written profile to %s", filepath)
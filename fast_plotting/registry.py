@@ -1,17 +1,259 @@
-"""Top functionality to handle input data and register"""
+"""Top functionality to handle input data and register
 
-from fast_plotting.data import DataWrapper
-from fast_plotting.sources.root import read as get_from_root
-from fast_plotting.io import parse_json
+Data is registered lazily. Sources are registered as descriptors and the actual data is only
+loaded when it is requested for the first time. With a memory budget, least recently used data
+is evicted again as long as it is not pinned and can be loaded again.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import RLock
+
+from fast_plotting.sources import get_source_module, close_sources as close_source_modules
+from fast_plotting.cache import load_from_cache, save_to_cache
+from fast_plotting.profiling import profiled
 from fast_plotting.logger import get_logger
 
 DATA_LOGGER = get_logger("Data")
-# global dictionary to register all data
-DATA_REGISTRY = {}
+
+
+@profiled("convert_sources")
+def convert_sources(batches):
+    """Get data from several sources
+
+    Batches of the same source and file are read together, see read_many of the sources.
+
+    Args:
+        batches: iterable
+            Dictionaries containing all information to extract data
+    Returns:
+        list: the converted data as DataWrapper objects in the order of the batches
+    """
+    batches = list(batches)
+    data_wrappers = [None] * len(batches)
+    groups = {}
+    for i, batch in enumerate(batches):
+        # the source is only imported now
+        source = get_source_module(batch["source_name"])
+        if source.CACHEABLE:
+            data_wrappers[i] = load_from_cache(batch)
+            if data_wrappers[i]:
+                continue
+        groups.setdefault((source, batch.get("filepath")), []).append(i)
+
+    for (source, _), indices in groups.items():
+        for i, data_wrapper in zip(indices, source.read_many([batches[i] for i in indices])):
+            if source.CACHEABLE:
+                save_to_cache(batches[i], data_wrapper)
+            data_wrappers[i] = data_wrapper
+    return data_wrappers
+
+def convert_source(batch):
+    """Get some data from a source
+
+    Args:
+        batch: dict
+            Dictionary containing all information to extract data
+    Returns:
+        DataWrapper: the converted data
+    """
+    return convert_sources([batch])[0]
+
+class DataRegistry:
+    """Registry of DataWrapper objects identified by a unique name
+
+    The registry can be used from several threads. Data is loaded without holding the lock
+    so that loading in one thread does not block taking already loaded data in another one.
+    """
+
+    def __init__(self, memory_budget=None):
+        """init
+
+        Args:
+            memory_budget: int (optional)
+                maximum number of bytes of loaded data, unlimited if None
+        """
+        # source descriptors by identifier
+        self.sources = {}
+        # loaded data, least recently used first
+        self.data = OrderedDict()
+        # how often each identifier is pinned
+        self.pins = {}
+        # optional fast_plotting.store.DataStore to take data from
+        self.store = None
+        self.memory_budget = memory_budget
+        # bytes currently loaded
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = RLock()
+
+    def __contains__(self, identifier):
+        """Whether or not data is or can be loaded"""
+        return identifier in self.data or self.can_reload(identifier)
+
+    def can_reload(self, identifier):
+        """Whether or not data can be loaded (again) from a source or the store"""
+        return identifier in self.sources or (self.store is not None and identifier in self.store)
+
+    def register_source(self, batch):
+        """Register a source descriptor, data is only loaded on demand"""
+        identifier = batch["identifier"]
+        with self.lock:
+            if self.sources.get(identifier, batch) != batch:
+                DATA_LOGGER.warning("Source %s registered again with different settings, replacing it", identifier)
+                self.remove(identifier)
+            self.sources[identifier] = batch
+
+    def insert(self, identifier, data_wrapper):
+        """Insert loaded data and evict other data if needed"""
+        with self.lock:
+            self.remove(identifier)
+            self.data[identifier] = data_wrapper
+            self.memory += data_wrapper.nbytes
+            self.evict()
+
+    def add(self, identifier, data_wrapper):
+        """Add data explicitly
+
+        Data without a source descriptor cannot be loaded again and is hence never evicted.
+        """
+        if identifier in self.data:
+            DATA_LOGGER.warning("Data %s is already there, replacing it", identifier)
+        self.insert(identifier, data_wrapper)
+
+    def remove(self, identifier):
+        """Drop loaded data, a source descriptor is kept so that the data can be loaded again"""
+        with self.lock:
+            data_wrapper = self.data.pop(identifier, None)
+            if data_wrapper is not None:
+                self.memory -= data_wrapper.nbytes
+
+    def fetch(self, identifier):
+        """Load data from the store or from its source"""
+        if self.store is not None and identifier in self.store:
+            # zero-copy views into the store
+            return self.store.get(identifier)
+        if identifier not in self.sources:
+            DATA_LOGGER.critical("Data %s not registered", identifier)
+        return convert_source(self.sources[identifier])
+
+    def get(self, identifier):
+        """Get data, load it if not done yet"""
+        with self.lock:
+            data_wrapper = self.data.get(identifier)
+            if data_wrapper is not None:
+                self.hits += 1
+                self.data.move_to_end(identifier)
+                return data_wrapper
+            self.misses += 1
+        data_wrapper = self.fetch(identifier)
+        self.insert(identifier, data_wrapper)
+        return data_wrapper
+
+    def load(self, identifiers):
+        """Make sure data is loaded, sources from the same file are read together"""
+        with self.lock:
+            missing = [identifier for identifier in dict.fromkeys(identifiers) if identifier not in self.data]
+            self.misses += len(missing)
+            from_sources = []
+            for identifier in missing:
+                if identifier in self.sources and (self.store is None or identifier not in self.store):
+                    from_sources.append(identifier)
+                    continue
+                self.insert(identifier, self.fetch(identifier))
+            batches = [self.sources[i] for i in from_sources]
+        for identifier, data_wrapper in zip(from_sources, convert_sources(batches)):
+            self.insert(identifier, data_wrapper)
+
+    def pin(self, identifiers):
+        """Protect data from being evicted"""
+        with self.lock:
+            for identifier in identifiers:
+                self.pins[identifier] = self.pins.get(identifier, 0) + 1
+
+    def unpin(self, identifiers):
+        """Undo pin, data can be evicted again once it is not pinned anymore"""
+        with self.lock:
+            for identifier in identifiers:
+                self.pins[identifier] -= 1
+                if not self.pins[identifier]:
+                    del self.pins[identifier]
+            self.evict()
+
+    @contextmanager
+    def pinned(self, identifiers):
+        """Pin data while in this context"""
+        identifiers = list(identifiers)
+        self.pin(identifiers)
+        try:
+            yield
+        finally:
+            self.unpin(identifiers)
+
+    def evict(self):
+        """Evict least recently used data until the memory budget is met"""
+        with self.lock:
+            if self.memory_budget is None or self.memory <= self.memory_budget:
+                return
+            for identifier in list(self.data):
+                if self.memory <= self.memory_budget:
+                    break
+                if identifier in self.pins or not self.can_reload(identifier):
+                    continue
+                self.remove(identifier)
+                self.evictions += 1
+                DATA_LOGGER.debug("Evicted %s", identifier)
+
+    def clear(self):
+        """Remove everything, also source descriptors"""
+        with self.lock:
+            self.sources.clear()
+            self.data.clear()
+            self.pins.clear()
+            self.memory = 0
+
+    def get_stats(self):
+        """Counters of this registry"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "loaded": len(self.data), "memory": self.memory}
+
+# global registry of all data
+DATA_REGISTRY = DataRegistry()
 
 def print_registry():
-    """Print the registry dictionary"""
-    print(DATA_REGISTRY)
+    """Print the registry"""
+    print(f"Registered sources: {list(DATA_REGISTRY.sources)}")
+    print(f"Loaded data: {list(DATA_REGISTRY.data)}")
+    print(f"Stats: {DATA_REGISTRY.get_stats()}")
+
+def configure_registry(memory_budget=None):
+    """Configure the global registry
+
+    Args:
+        memory_budget: int (optional)
+            maximum number of bytes of loaded data, unlimited if None
+    """
+    DATA_REGISTRY.memory_budget = memory_budget
+    DATA_REGISTRY.evict()
+
+def attach_store(store):
+    """Take data from a store if it is not registered otherwise
+
+    Args:
+        store: fast_plotting.store.DataStore or None
+            the store to attach, None to detach
+    """
+    DATA_REGISTRY.store = store
+
+def get_store():
+    """Get the attached store, None if there is none"""
+    return DATA_REGISTRY.store
+
+def clear_registry():
+    """Remove everything from the registry"""
+    DATA_REGISTRY.clear()
 
 def add_to_registry(identifier, data_wrapper):
     """Add some data to registry
@@ -22,56 +264,123 @@ def add_to_registry(identifier, data_wrapper):
         data_wrapper: fast_plotting.data.DataWrapper
             the data to be registered
     """
-    if identifier in DATA_REGISTRY:
-        DATA_LOGGER.critical("Data %s is already there, not adding it", identifier)
+    DATA_REGISTRY.add(identifier, data_wrapper)
 
-    DATA_REGISTRY[identifier] = data_wrapper
+def remove_from_registry(identifier):
+    """Remove a DataWrapper object from the registry
+
+    It can still be loaded again if its source is known.
+
+    Args:
+        identifier: str
+            unique name
+    """
+    DATA_REGISTRY.remove(identifier)
 
 def get_from_registry(identifier):
-    """Get a DataWrapper object by name
+    """Get a DataWrapper object by name, load it if necessary
 
     Args:
         identifier: str
             unique name
     """
-    if identifier not in DATA_REGISTRY:
-        DATA_LOGGER.critical("Data %s not registered", identifier)
-    return DATA_REGISTRY[identifier]
+    return DATA_REGISTRY.get(identifier)
+
+def load_into_registry(identifiers):
+    """Make sure data of registered sources is loaded
+
+    Args:
+        identifiers: iterable
+            unique names
+    """
+    DATA_REGISTRY.load(identifiers)
+
+def pin_in_registry(identifiers):
+    """Protect data from being evicted
+
+    Args:
+        identifiers: iterable
+            unique names
+    """
+    DATA_REGISTRY.pin(identifiers)
+
+def unpin_in_registry(identifiers):
+    """Allow data to be evicted again
+
+    Args:
+        identifiers: iterable
+            unique names
+    """
+    DATA_REGISTRY.unpin(identifiers)
 
+def register_sources(source_batches):
+    """Register sources to be loaded on demand
+
+    Args:
+        source_batches: iterable
+            source dictionaries
+    """
+    for batch in source_batches:
+        DATA_REGISTRY.register_source(batch)
+
+@profiled("get_data_from_source")
 def get_data_from_source(batch):
-    """Get some data from a source
+    """Get some data from a source and add it to the registry
 
     Args:
         batch: dict
             Dictionary containing all information to extract data
     """
-    source_name = batch["source_name"].lower()
-    identifier = batch["identifier"]
+    DATA_REGISTRY.register_source(batch)
+    DATA_REGISTRY.load([batch["identifier"]])
 
-    if source_name == "root":
-        if "filepath" not in batch or "rootpath" not in batch:
-            DATA_LOGGER.critical("Need filepath and path to object inside ROOT file")
-        data, uncertainties, data_annotations = get_from_root(batch["filepath"], batch["rootpath"])
-        data_wrapper = DataWrapper(identifier, data, data_annotations=data_annotations, uncertainties=uncertainties)
-        add_to_registry(identifier, data_wrapper)
-    else:
-        DATA_LOGGER.critical("Cannot digest from source %s", source_name)
+def iter_loaded(source_batches):
+    """Load sources one at a time
 
-def read_from_config(config):
-    """Read from a JSON config
+    Data is removed from the registry again when the next one is requested, so only one of them
+    is loaded at a time.
 
     Args:
-        config: str
-            apth to config JSON
+        source_batches: iterable
+            source dictionaries
+    Yields:
+        DataWrapper: the data of each source in the given order
     """
-    # Only load objects we actually need
-    load_only_identifiers = []
-    for batch in config.get_plots():
-        if not batch["enable"]:
-            continue
-        for o in batch["objects"]:
-            load_only_identifiers.append(o["identifier"])
-    for batch in config.get_sources():
-        if batch["identifier"] not in load_only_identifiers:
-            continue
+    for batch in source_batches:
         get_data_from_source(batch)
+        yield get_from_registry(batch["identifier"])
+        remove_from_registry(batch["identifier"])
+
+def close_sources():
+    """Release all resources held by sources such as open files"""
+    close_source_modules()
+
+def count_references(plot_batches):
+    """Count how often each data identifier is used by plot batches
+
+    Args:
+        plot_batches: iterable
+            plot dictionaries
+    Returns:
+        dict: identifiers mapped to the number of plots using them
+    """
+    references = {}
+    for batch in plot_batches:
+        for o in batch["objects"]:
+            references[o["identifier"]] = references.get(o["identifier"], 0) + 1
+    return references
+
+def read_from_config(config, lazy=False):
+    """Register sources from a config
+
+    Args:
+        config: ConfigInterface
+            the configuration
+        lazy: bool
+            if True, data is only loaded when requested, otherwise everything needed by enabled plots is loaded right away
+    """
+    register_sources(config.get_sources())
+    if lazy:
+        return
+    # Only load objects we actually need
+    DATA_REGISTRY.load(count_references(batch for batch in config.get_plots() if batch["enable"]))
@@ -3,32 +3,69 @@
 import sys
 import argparse
 
-from fast_plotting.config import read_config, configure_from_sources
-from fast_plotting.registry import read_from_config
-from fast_plotting.plot import plot as plot_impl
-from fast_plotting.plot import add_plot_for_each_source, add_overlay_plot_for_sources
+from fast_plotting.config import ConfigInterface, read_config, configure_from_sources
+from fast_plotting.config import add_plot_for_each_source, add_overlay_plot_for_sources
+from fast_plotting.io import is_incremental
 
+from fast_plotting.profiling import enable_profiling, print_profile, write_profile, PROFILE_FORMATS
 from fast_plotting.logger import get_logger, reconfigure_logging
 
+# Plotting, data handling and sources are imported by the commands needing them so that
+# e.g. inspect neither needs ROOT nor matplotlib and starts quickly
+# pylint: disable=import-outside-toplevel
+
 MAIN_LOGGER = get_logger()
 
 def plot(args):
     """Plot from cmd args"""
+    from fast_plotting.registry import close_sources, attach_store, configure_registry, DATA_REGISTRY
+    from fast_plotting.store import make_store
+    from fast_plotting.cache import configure_cache, clear_cache
+    from fast_plotting.plot import plot as plot_impl, plot_incremental, enable_figure_pool, configure_rendering
+
     MAIN_LOGGER.info("Run")
-    config = read_config(args.config)
-    read_from_config(config)
-    plot_impl(config, args.output, args.all_in_one)
+    configure_cache(not args.no_cache, args.cache_dir)
+    if args.clear_cache:
+        clear_cache()
+    # plots can be rendered while the configuration is read unless all of them need to be known beforehand
+    incremental = is_incremental(args.config) and not (args.all_in_one or args.stream or args.store)
+    config = ConfigInterface() if incremental else read_config(args.config)
+    configure_rendering(engine=args.engine, downsample_threshold=args.downsample_threshold, dpi=args.dpi,
+                        compress_level=args.compress_level, format=args.format, dry_run=args.dry_run)
+    if args.recycle_figures:
+        enable_figure_pool()
+    if args.memory_budget is not None:
+        configure_registry(args.memory_budget * 1024**2)
+    # nothing is written when running dry, so nothing can be up to date either
+    force = args.force or args.dry_run
+    try:
+        if incremental:
+            failed = plot_incremental(config, args.config, args.output, args.jobs, force, args.prefetch)
+        else:
+            if args.store:
+                attach_store(make_store(config, args.store))
+            # with a memory budget, load on demand since not everything might fit at the same time,
+            # when prefetching, loading happens in the background while plotting and a store is read on demand anyway
+            lazy = args.store is not None or args.memory_budget is not None or args.prefetch > 0
+            failed = plot_impl(config, args.output, args.all_in_one, args.jobs, args.stream, force, args.prefetch,
+                               args.page_size, args.gallery, lazy)
+    finally:
+        close_sources()
+    MAIN_LOGGER.debug("Data registry: %s", DATA_REGISTRY.get_stats())
+    if failed:
+        MAIN_LOGGER.error("%d plot(s) failed", len(failed))
+        return 1
     MAIN_LOGGER.info("Done")
     return 0
 
 def configure(args):
     """create a configuration"""
     if not args.config:
-        config = configure_from_sources(args.files, args.labels)
+        config = configure_from_sources(args.files, args.labels, jobs=args.jobs, same_structure=args.same_structure)
         if args.single:
-            add_plot_for_each_source(config)
+            add_plot_for_each_source(config, args.format)
         if args.overlay:
-            add_overlay_plot_for_sources(config)
+            add_overlay_plot_for_sources(config, args.format)
     else:
         # in this case we don't add plots, let's keep things simple for now
         config = read_config(args.config)
@@ -38,6 +75,24 @@ def configure(args):
     config.write(args.output)
     return 0
 
+def convert(args):
+    """Convert all sources of a configuration to a fast local format"""
+    from fast_plotting.sources.npz import convert_config
+    from fast_plotting.registry import close_sources
+
+    config = read_config(args.config)
+    try:
+        batches = convert_config(config, args.data)
+    finally:
+        close_sources()
+    converted = ConfigInterface()
+    for b in batches:
+        converted.add_data_source(**b)
+    for p in config.get_plots():
+        converted.add_plot(**p)
+    converted.write(args.output)
+    return 0
+
 def inspect(args):
     """Quick inspection of config"""
     config = read_config(args.config)
@@ -51,6 +106,12 @@ def main():
 
     common_debug_parser = argparse.ArgumentParser(add_help=False)
     common_debug_parser.add_argument("--debug", action="store_true")
+    common_debug_parser.add_argument("--profile", action="store_true", help="print time spent per stage (main process only)")
+    common_debug_parser.add_argument("--profile-memory", dest="profile_memory", action="store_true",
+                                     help="also trace memory allocated per stage, slows everything down")
+    common_debug_parser.add_argument("--profile-output", dest="profile_output", help="where to write the profile to")
+    common_debug_parser.add_argument("--profile-format", dest="profile_format", choices=PROFILE_FORMATS, default=PROFILE_FORMATS[0],
+                                     help="write summary as JSON or every single stage as Chrome trace")
 
     main_parser = argparse.ArgumentParser("FastPlotting")
     sub_parsers = main_parser.add_subparsers(dest="command")
@@ -60,17 +121,55 @@ def main():
     plot_parser.add_argument("-c", "--config", help="plot configuration")
     plot_parser.add_argument("-o", "--output", help="Top directory where to save plots", default="./")
     plot_parser.add_argument("--all-in-one", dest="all_in_one", action="store_true", help="plot everything into one final figure")
+    plot_parser.add_argument("--page-size", dest="page_size", type=int, default=0,
+                             help="with --all-in-one, put at most this many plots on each summary page, "
+                                  "pages are separate files or one PDF with --format pdf")
+    plot_parser.add_argument("--gallery", action="store_true",
+                             help="with --all-in-one, write thumbnails and an HTML index of them instead of summary pages")
+    plot_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of parallel processes to plot with")
+    plot_parser.add_argument("--force", action="store_true", help="plot everything, also plots whose inputs have not changed since the last time")
+    plot_parser.add_argument("--stream", action="store_true", help="load data plot by plot and release it as soon as possible to bound memory usage")
+    plot_parser.add_argument("--prefetch", type=int, default=0,
+                             help="when plotting in one process, load data of the next N plots and write images in the background while rendering")
+    plot_parser.add_argument("--engine", default="default", help="render engine to be used if not specified per plot, \"default\" or \"fast\"")
+    plot_parser.add_argument("--downsample-threshold", dest="downsample_threshold", type=int, default=10000,
+                             help="series with more points are reduced to what can be resolved, 0 to disable")
+    plot_parser.add_argument("--format",
+                             help="file format of all plots, e.g. pdf, svg or raw (RGBA bytes), replaces the one given by their configured output")
+    plot_parser.add_argument("--dpi", type=float, help="resolution of saved plots if not specified per plot")
+    plot_parser.add_argument("--compress-level", dest="compress_level", type=int,
+                             help="zlib compression level of PNGs if not specified per plot, from 0 (fastest) to 9 (smallest)")
+    plot_parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="render all plots but do not write anything")
+    plot_parser.add_argument("--recycle-figures", dest="recycle_figures", action="store_true",
+                             help="reuse figures and their layout instead of creating new ones for every plot")
+    plot_parser.add_argument("--memory-budget", dest="memory_budget", type=int,
+                             help="maximum memory in MB for loaded data, least recently used data is evicted beyond that")
+    plot_parser.add_argument("--store", help="materialise all needed data into this memory-mapped file (reused if up to date) and plot from there")
+    plot_parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="neither read from nor write to the cache of converted data")
+    plot_parser.add_argument("--clear-cache", dest="clear_cache", action="store_true", help="clear the cache of converted data before plotting")
+    plot_parser.add_argument("--cache-dir", dest="cache_dir", help="directory of the cache of converted data")
 
     config_parser = sub_parsers.add_parser("configure", parents=[common_debug_parser])
     config_parser.set_defaults(func=configure)
     config_parser.add_argument("--config", "-c", help="Pass already existing config if it should be altered in place")
     config_parser.add_argument("-f", "--files", nargs="*", help="An input file from which to build a configuration")
     config_parser.add_argument("-l", "--labels", nargs="*", help="A label for the data")
-    config_parser.add_argument("-o", "--output", help="Where to write the derived JSON configuration", default="config.json")
+    config_parser.add_argument("-o", "--output", default="config.json",
+                               help="Where to write the derived configuration, format is chosen by extension (.json, .jsonl, .msgpack)")
     config_parser.add_argument("--overlay", help="If the sources have the same structure, make overlay plots", action="store_true")
     config_parser.add_argument("--single", help="Make single plots for each source found", action="store_true")
+    config_parser.add_argument("--format", help="File format of the plots made with --single or --overlay", default="png")
+    config_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of parallel processes to scan input files with")
+    config_parser.add_argument("--same-structure", dest="same_structure", action="store_true",
+                               help="All input files have the same internal structure, only scan the first one")
     config_parser.add_argument("--enable-plots", dest="enable_plots", nargs="+", help="Enable plots (pass \"all\" to enable all plots)", default=[])
 
+    convert_parser = sub_parsers.add_parser("convert", parents=[common_debug_parser])
+    convert_parser.set_defaults(func=convert)
+    convert_parser.add_argument("-c", "--config", help="configuration whose sources should be converted", required=True)
+    convert_parser.add_argument("-d", "--data", help="where to write all data to (.npz)", required=True)
+    convert_parser.add_argument("-o", "--output", help="where to write the configuration using the converted data", required=True)
+
     inspect_parser = sub_parsers.add_parser("inspect", parents=[common_debug_parser])
     inspect_parser.set_defaults(func=inspect)
     inspect_parser.add_argument("-c", "--config", help="plot configuration")
@@ -80,7 +179,16 @@ def main():
     # reconfigure in case user wants to enable debug messages
     reconfigure_logging(args.debug)
 
-    return args.func(args)
+    profile = args.profile or args.profile_memory or args.profile_output
+    if profile:
+        enable_profiling(args.profile_memory)
+    try:
+        return args.func(args)
+    finally:
+        if profile:
+            print_profile()
+            if args.profile_output:
+                write_profile(args.profile_output, args.profile_format)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,138 @@
+"""Scheduling of plot batches
+
+Plots and the data sources they use form a bipartite graph. Batches are ordered such that plots
+sharing data follow each other closely. In that way, data can be loaded once and released soon.
+"""
+
+from collections import Counter
+from heapq import heappush, heappop
+from os.path import getsize, isfile
+
+
+def build_graph(batches):
+    """Build the bipartite graph between plots and data
+
+    Args:
+        batches: iterable
+            plot batches
+    Returns:
+        list, dict: identifiers used per plot (same order as batches) and plot indices per identifier
+    """
+    plot_to_data = []
+    data_to_plots = {}
+    for i, b in enumerate(batches):
+        identifiers = {o["identifier"] for o in b["objects"]}
+        plot_to_data.append(identifiers)
+        for identifier in identifiers:
+            data_to_plots.setdefault(identifier, []).append(i)
+    return plot_to_data, data_to_plots
+
+def estimate_peak(batches, weights=None):
+    """Estimate the peak memory when data is loaded at first and released after last use
+
+    Args:
+        batches: iterable
+            plot batches in the order they would be plotted
+        weights: dict (optional)
+            size per data identifier, each identifier counts 1 if not given
+    Returns:
+        peak memory in units of weights
+    """
+    plot_to_data, _ = build_graph(batches)
+    last_use = {}
+    for i, identifiers in enumerate(plot_to_data):
+        for identifier in identifiers:
+            last_use[identifier] = i
+    weights = weights or {}
+    current = 0
+    peak = 0
+    loaded = set()
+    for i, identifiers in enumerate(plot_to_data):
+        for identifier in identifiers - loaded:
+            loaded.add(identifier)
+            current += weights.get(identifier, 1)
+        peak = max(peak, current)
+        for identifier in identifiers:
+            if last_use[identifier] == i:
+                loaded.remove(identifier)
+                current -= weights.get(identifier, 1)
+    return peak
+
+def estimate_sizes(batches, sources):
+    """Estimate the bytes of data used by batches before anything is loaded
+
+    Each source is assumed to take an equal share of the size of its file.
+
+    Args:
+        batches: iterable
+            plot batches
+        sources: dict
+            source batches by identifier
+    Returns:
+        dict: estimated bytes per data identifier, missing if unknown
+    """
+    per_file = Counter(s.get("filepath") for s in sources.values())
+    sizes = {}
+    for identifier in {o["identifier"] for b in batches for o in b["objects"]}:
+        filepath = sources.get(identifier, {}).get("filepath")
+        if filepath and isfile(filepath):
+            sizes[identifier] = getsize(filepath) / per_file[filepath]
+    return sizes
+
+def schedule_batches(batches):
+    """Order batches such that data shared between plots is used in a short time window
+
+    Greedily pick the next plot that shares most data with what is currently loaded. Ties are
+    resolved by preferring plots which would require less data to be loaded in addition, then by
+    the original order. If nothing is shared, continue with the first plot not yet scheduled.
+
+    Candidates are kept in a heap. Whenever the score of a plot changes, it is pushed again and
+    outdated entries are skipped when popped, so scheduling scales with the number of edges of
+    the graph rather than quadratically with the number of plots.
+
+    Args:
+        batches: list
+            plot batches
+    Returns:
+        list: the same batches in scheduled order
+    """
+    plot_to_data, data_to_plots = build_graph(batches)
+    # how many plots still need each identifier
+    remaining = {identifier: len(plots) for identifier, plots in data_to_plots.items()}
+    loaded = set()
+    # number of loaded identifiers used by each plot
+    scores = [0] * len(batches)
+    # entries of (-score, number of identifiers to be loaded in addition, index)
+    candidates = []
+    scheduled = [False] * len(batches)
+    order = []
+    next_unscheduled = 0
+
+    while len(order) < len(batches):
+        pick = None
+        while candidates:
+            negative_score, _, i = heappop(candidates)
+            if not scheduled[i] and -negative_score == scores[i]:
+                pick = i
+                break
+        if pick is None:
+            while scheduled[next_unscheduled]:
+                next_unscheduled += 1
+            pick = next_unscheduled
+        scheduled[pick] = True
+        order.append(pick)
+
+        for identifier in plot_to_data[pick]:
+            remaining[identifier] -= 1
+            if identifier not in loaded and remaining[identifier]:
+                # becomes loaded and is needed later, promote plots using it
+                loaded.add(identifier)
+                for i in data_to_plots[identifier]:
+                    if not scheduled[i]:
+                        scores[i] += 1
+                        heappush(candidates, (-scores[i], len(plot_to_data[i]) - scores[i], i))
+            elif identifier in loaded and not remaining[identifier]:
+                # not needed anymore, hence by no plot which is not scheduled yet
+                loaded.remove(identifier)
+
+    return [batches[i] for i in order]
@@ -0,0 +1,96 @@
+"""Data sources
+
+Each source is implemented in its own module which is only imported when the source is actually
+used. Hence, e.g. ROOT is only required if data is read from ROOT files. A source module provides
+
+    discover(filepath)
+        returning source batches of everything found in a file, None if the file cannot be handled
+    read(batch)
+        returning the DataWrapper described by a source batch
+    read_many(batches)
+        returning DataWrapper objects of several source batches, typically from the same file
+    close_files()
+        releasing all resources such as open files
+    CACHEABLE
+        whether or not converted data is worth being cached, see fast_plotting.cache
+
+Source batches are dictionaries with at least "source_name", "identifier" and "filepath", everything
+else is specific to a source. They can request the type to store data with via "dtype".
+"""
+
+from importlib import import_module
+from os.path import splitext
+
+from fast_plotting.logger import get_logger
+
+SOURCES_LOGGER = get_logger("Sources")
+
+# source names mapped to the modules implementing them
+SOURCE_MODULES = {"root": "fast_plotting.sources.root",
+                  "npz": "fast_plotting.sources.npz",
+                  "columnar": "fast_plotting.sources.columnar"}
+# file extensions mapped to the sources which can discover data in such files
+SOURCE_EXTENSIONS = {".root": "root",
+                     ".npz": "npz",
+                     ".npy": "npz",
+                     ".csv": "columnar",
+                     ".parquet": "columnar"}
+# source modules which have been imported already
+LOADED_SOURCES = {}
+
+
+def register_source_module(source_name, module_name, extensions=()):
+    """Make a source module known
+
+    Args:
+        source_name: str
+            name used as "source_name" in source batches
+        module_name: str
+            full name of the module to be imported on first use
+        extensions: iterable
+            file extensions the source discovers data in
+    """
+    source_name = source_name.lower()
+    SOURCE_MODULES[source_name] = module_name
+    for extension in extensions:
+        SOURCE_EXTENSIONS[extension.lower()] = source_name
+
+def get_source_module(source_name):
+    """Get the module of a source, import it if not done yet"""
+    source_name = source_name.lower()
+    module = LOADED_SOURCES.get(source_name)
+    if module is not None:
+        return module
+    if source_name not in SOURCE_MODULES:
+        SOURCES_LOGGER.critical("Unknown source %s", source_name)
+    try:
+        module = import_module(SOURCE_MODULES[source_name])
+    except ImportError as e:
+        SOURCES_LOGGER.critical("Cannot use source %s: %s", source_name, e)
+    LOADED_SOURCES[source_name] = module
+    return module
+
+def get_source_name_for_file(filepath):
+    """Name of the source which can discover data in a file, None if there is none"""
+    return SOURCE_EXTENSIONS.get(splitext(filepath)[1].lower())
+
+def discover(filepath):
+    """Find everything a source can read from a file
+
+    Returns:
+        list: source batches or None if no source can handle the file
+    """
+    source_name = get_source_name_for_file(filepath)
+    if source_name is None:
+        SOURCES_LOGGER.error("No source to handle file %s", filepath)
+        return None
+    return get_source_module(source_name).discover(filepath)
+
+def read_each(read, batches):
+    """Fallback for read_many of sources which cannot profit from reading several objects at once"""
+    return [read(batch) for batch in batches]
+
+def close_sources():
+    """Release resources of all sources which have been used, nothing else is imported"""
+    for module in LOADED_SOURCES.values():
+        module.close_files()
@@ -0,0 +1,118 @@
+"""Handle columnar files as data source
+
+Data is read from columns of CSV files with a header line or of Parquet files, the latter
+requires pyarrow. Each object is made of one column for x and one for y, optionally with
+another column holding symmetric uncertainties of y.
+"""
+
+from os.path import splitext, abspath, expanduser
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.logger import get_logger
+
+COLUMNAR_LOGGER = get_logger("ColumnarSources")
+
+# reading columns from a few files is not worth caching
+CACHEABLE = False
+
+# columns holding uncertainties of other columns
+ERRORS_SUFFIX = "_err"
+# layout of uncertainties, only given for y, see fast_plotting.data.DataWrapper
+ERROR_LAYOUT = {"symmetric": True, "error_axes": (1,)}
+CSV_DELIMITER = ","
+
+
+def is_parquet(filepath):
+    """Parquet files are identified by their extension, everything else is CSV"""
+    return splitext(filepath)[1].lower() == ".parquet"
+
+def import_parquet():
+    """pyarrow is optional, only needed for Parquet files"""
+    try:
+        import pyarrow.parquet as pq # pylint: disable=import-outside-toplevel
+    except ImportError:
+        COLUMNAR_LOGGER.critical("Package pyarrow is required to read Parquet files, install it with \"pip install pyarrow\"")
+    return pq
+
+def read_column_names(filepath, delimiter=CSV_DELIMITER):
+    """Names of all columns of a file"""
+    if is_parquet(filepath):
+        return import_parquet().read_schema(filepath).names
+    with open(filepath, "r", encoding="utf-8") as f:
+        return [c.strip() for c in f.readline().split(delimiter)]
+
+def read_columns(filepath, columns, dtype=None, delimiter=CSV_DELIMITER):
+    """Read only the requested columns of a file
+
+    Returns:
+        dict: column names mapped to numpy.ndarray
+    """
+    columns = list(dict.fromkeys(columns))
+    if is_parquet(filepath):
+        table = import_parquet().read_table(filepath, columns=columns)
+        return {c: table.column(c).to_numpy().astype(dtype or np.float64, copy=False) for c in columns}
+    names = read_column_names(filepath, delimiter)
+    missing = [c for c in columns if c not in names]
+    if missing:
+        COLUMNAR_LOGGER.critical("Cannot find columns %s in %s", ", ".join(missing), filepath)
+    values = np.loadtxt(filepath, delimiter=delimiter, skiprows=1, usecols=[names.index(c) for c in columns],
+                        dtype=dtype or np.float64, ndmin=2)
+    return {c: values[:,i] for i, c in enumerate(columns)}
+
+def columns_of(batch):
+    """Columns needed for a source batch"""
+    columns = [batch["x"], batch["y"]]
+    if batch.get("yerr"):
+        columns.append(batch["yerr"])
+    return columns
+
+def make_data_wrapper(batch, values):
+    """Build the DataWrapper of a batch from the values of its columns"""
+    data = np.column_stack((values[batch["x"]], values[batch["y"]]))
+    uncertainties = values[batch["yerr"]][:,None] if batch.get("yerr") else None
+    return DataWrapper(batch["identifier"], data, uncertainties=uncertainties,
+                       data_annotations=DataAnnotations(axis_labels=[batch["x"], batch["y"]]), **ERROR_LAYOUT)
+
+def read(batch):
+    """Get the DataWrapper described by a source batch
+
+    Args:
+        batch: dict
+            source batch with "filepath", the column names "x" and "y" and optionally "yerr".
+            The "delimiter" of CSV files can be specified as well.
+    """
+    return read_many([batch])[0]
+
+def read_many(batches):
+    """Get DataWrapper objects of several source batches, each file is read only once"""
+    by_file = {}
+    for batch in batches:
+        by_file.setdefault((batch["filepath"], batch.get("delimiter", CSV_DELIMITER), batch.get("dtype")), []).append(batch)
+    data_wrappers = {}
+    for (filepath, delimiter, dtype), file_batches in by_file.items():
+        values = read_columns(filepath, [c for b in file_batches for c in columns_of(b)], dtype, delimiter)
+        for batch in file_batches:
+            data_wrappers[batch["identifier"]] = make_data_wrapper(batch, values)
+    return [data_wrappers[batch["identifier"]] for batch in batches]
+
+def close_files():
+    """Files are not kept open"""
+
+def discover(filepath):
+    """Use the first column as x and make an object for each other column"""
+    filepath = abspath(expanduser(filepath))
+    names = read_column_names(filepath)
+    if len(names) < 2:
+        COLUMNAR_LOGGER.error("Need at least 2 columns in %s", filepath)
+        return None
+    batches = []
+    for name in names[1:]:
+        if name.endswith(ERRORS_SUFFIX):
+            continue
+        batch = {"source_name": "columnar", "identifier": name, "filepath": filepath, "x": names[0], "y": name}
+        if f"{name}{ERRORS_SUFFIX}" in names:
+            batch["yerr"] = f"{name}{ERRORS_SUFFIX}"
+        batches.append(batch)
+    return batches
@@ -0,0 +1,239 @@
+"""Handle NumPy files as data source
+
+Data is read from .npy files or members of .npz archives. Arrays are memory-mapped and hence
+not copied as long as .npz members are stored without compression, which is what numpy.savez
+does. Arrays have to be of shape (n, dim). Uncertainties of a member are looked up in a member
+of the same name plus ERRORS_SUFFIX. Unless specified otherwise, uncertainties of shape (n,) or
+(n, k) are symmetric and (n, k, 2) asymmetric, and they are given for the last k axes.
+"""
+
+from os.path import basename, splitext, abspath, expanduser
+from zipfile import ZipFile, ZIP_STORED
+import struct
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.sources import read_each
+from fast_plotting.logger import get_logger
+
+NPZ_LOGGER = get_logger("NPZSources")
+
+# reading is already as fast as reading from the cache
+CACHEABLE = False
+
+# members holding uncertainties of other members
+ERRORS_SUFFIX = "__errors"
+# size of the fixed part of a local file header in a ZIP archive
+ZIP_LOCAL_HEADER_SIZE = 30
+ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+# general purpose flag of encrypted members
+ZIP_FLAG_ENCRYPTED = 0x1
+
+# memory-mapped files and their members mapped to the offset of the array header
+NPZ_FILES = {}
+
+
+def member_offsets(filepath, zip_file):
+    """Map uncompressed members to where their content starts inside the archive and its size
+
+    Members are left out if their layout is not understood, they are read with numpy.load then.
+    """
+    offsets = {}
+    with open(filepath, "rb") as f:
+        for info in zip_file.infolist():
+            if info.compress_type != ZIP_STORED or info.flag_bits & ZIP_FLAG_ENCRYPTED:
+                continue
+            # the local header can differ from the central directory, so read its lengths
+            f.seek(info.header_offset)
+            local_header = f.read(ZIP_LOCAL_HEADER_SIZE)
+            if len(local_header) < ZIP_LOCAL_HEADER_SIZE or local_header[:4] != ZIP_LOCAL_HEADER_SIGNATURE:
+                continue
+            name_length, extra_length = struct.unpack("<HH", local_header[-4:])
+            if f.read(name_length) != info.orig_filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437"):
+                continue
+            offsets[info.filename] = (info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length, info.file_size)
+    return offsets
+
+def open_file(filepath):
+    """Get a memory-mapped archive together with offsets of its members"""
+    if filepath not in NPZ_FILES:
+        with ZipFile(filepath) as zip_file:
+            members = {info.filename for info in zip_file.infolist()}
+            offsets = member_offsets(filepath, zip_file)
+        NPZ_FILES[filepath] = (np.memmap(filepath, dtype=np.uint8, mode="r"), members, offsets)
+    return NPZ_FILES[filepath]
+
+def close_files():
+    """Release all memory-mapped files
+
+    Arrays which are still in use keep their mapping alive
+    """
+    NPZ_FILES.clear()
+
+class BufferReader:
+    """Minimal file-like object to let numpy parse a header from a buffer"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.buffer = None
+
+    def read(self, size):
+        chunk = self.buffer[self.position:self.position + size].tobytes()
+        self.position += len(chunk)
+        return chunk
+
+    def tell(self):
+        return self.position
+
+def load_member_copy(filepath, key):
+    """Read a member of an archive with numpy"""
+    with np.load(filepath) as npz:
+        return npz[key]
+
+def load_member(filepath, key):
+    """Load a member of an archive, without copying if it is not compressed"""
+    buffer, members, offsets = open_file(filepath)
+    name = f"{key}.npy"
+    if name not in members:
+        NPZ_LOGGER.critical("Cannot find %s in %s", key, filepath)
+    if name not in offsets:
+        # compressed or not understood, needs to be read
+        return load_member_copy(filepath, key)
+
+    offset, size = offsets[name]
+    end = offset + size
+    if end > len(buffer):
+        return load_member_copy(filepath, key)
+    header = memoryview(buffer[offset:min(offset + 2**16, end)])
+    # parse the header of the .npy file in place
+    with BufferReader(header) as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset += f.tell()
+    if dtype.hasobject:
+        NPZ_LOGGER.critical("Cannot read %s from %s holding Python objects", key, filepath)
+    n_bytes = int(np.prod(shape)) * dtype.itemsize
+    if offset + n_bytes != end:
+        # something is off, do not risk reading the wrong bytes
+        NPZ_LOGGER.debug("Unexpected layout of %s in %s, reading it", key, filepath)
+        return load_member_copy(filepath, key)
+    return buffer[offset:offset + n_bytes].view(dtype).reshape(shape, order="F" if fortran_order else "C")
+
+def load(filepath, key=None):
+    """Load an array from a .npy file or a member of a .npz archive"""
+    if key is None:
+        return np.load(filepath, mmap_mode="r")
+    return load_member(filepath, key)
+
+def read(batch):
+    """Get the DataWrapper described by a source batch
+
+    Args:
+        batch: dict
+            source batch with "filepath" and, in case of an archive, the member "key". Optionally,
+            the member holding uncertainties ("errors_key"), whether they are "symmetric", the
+            "error_axes" and "axis_labels"
+    """
+    filepath = batch["filepath"]
+    data = load(filepath, batch.get("key"))
+    if data.ndim == 1:
+        # just values, number them
+        data = np.column_stack((np.arange(len(data), dtype=data.dtype), data))
+    kwargs = {"dtype": batch.get("dtype")}
+    if batch.get("errors_key"):
+        uncertainties = load(filepath, batch["errors_key"])
+        if uncertainties.ndim == 1:
+            # one symmetric uncertainty per point, e.g. along y of 1D data
+            uncertainties = uncertainties[:,None]
+        n_error_axes = uncertainties.shape[1]
+        kwargs.update(uncertainties=uncertainties, symmetric=batch.get("symmetric", uncertainties.ndim == 2),
+                      error_axes=batch.get("error_axes", range(data.shape[1] - n_error_axes, data.shape[1])))
+    if "axis_labels" in batch:
+        kwargs["data_annotations"] = DataAnnotations(axis_labels=batch["axis_labels"])
+    return DataWrapper(batch["identifier"], data, **kwargs)
+
+def read_many(batches):
+    """Get DataWrapper objects of several source batches"""
+    return read_each(read, batches)
+
+def discover(filepath):
+    """Everything which can be read from a .npy file or a .npz archive"""
+    filepath = abspath(expanduser(filepath))
+    name, extension = splitext(basename(filepath))
+    if extension == ".npy":
+        return [{"source_name": "npz", "identifier": name, "filepath": filepath}]
+    with ZipFile(filepath) as zip_file:
+        keys = [splitext(n)[0] for n in zip_file.namelist() if n.endswith(".npy")]
+    batches = []
+    for key in keys:
+        if key.endswith(ERRORS_SUFFIX):
+            continue
+        batch = {"source_name": "npz", "identifier": key, "filepath": filepath, "key": key}
+        if f"{key}{ERRORS_SUFFIX}" in keys:
+            batch["errors_key"] = f"{key}{ERRORS_SUFFIX}"
+        batches.append(batch)
+    return batches
+
+def write(filepath, data_wrappers):
+    """Write DataWrapper objects into an uncompressed .npz archive
+
+    Args:
+        filepath: str
+            where to write the archive
+        data_wrappers: iterable
+            DataWrapper objects, can be a generator so that not all of them need to be in memory
+    Returns:
+        list: source batches to read the data back
+    """
+    filepath = abspath(expanduser(filepath))
+    batches = []
+    with ZipFile(filepath, "w", ZIP_STORED, allowZip64=True) as zip_file:
+        for data_wrapper in data_wrappers:
+            key = data_wrapper.name
+            with zip_file.open(f"{key}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(data_wrapper.data))
+            batch = {"source_name": "npz", "identifier": key, "filepath": filepath, "key": key,
+                     "axis_labels": list(data_wrapper.data_annotations.axis_labels)}
+            if data_wrapper.errors is not None:
+                batch["errors_key"] = f"{key}{ERRORS_SUFFIX}"
+                batch["symmetric"] = data_wrapper.symmetric
+                batch["error_axes"] = list(data_wrapper.error_axes)
+                with zip_file.open(f"{batch['errors_key']}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, np.asanyarray(data_wrapper.errors))
+            batches.append(batch)
+    # the archive has changed
+    NPZ_FILES.pop(filepath, None)
+    NPZ_LOGGER.info("Written %d objects to %s", len(batches), filepath)
+    return batches
+
+def convert_config(config, filepath):
+    """Convert all sources of a configuration into one .npz archive
+
+    Sources are loaded one at a time and released after they have been written.
+
+    Args:
+        config: ConfigInterface
+            configuration to be converted
+        filepath: str
+            where to write the archive
+    Returns:
+        list: source batches to replace the original ones
+    """
+    # pylint: disable=import-outside-toplevel
+    from fast_plotting.registry import iter_loaded
+
+    batches = write(filepath, iter_loaded(config.get_sources()))
+    # keep everything which is not about where the data comes from, e.g. the label
+    for batch, source in zip(batches, config.get_sources()):
+        batch.update({k: v for k, v in source.items() if k in ("label",)})
+    return batches
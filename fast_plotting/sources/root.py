@@ -1,75 +1,221 @@
 """Handle ROOT as data source"""
 
+from collections import OrderedDict
+
 import numpy as np
 
-from ROOT import TFile, TH1, TH2, TH3, TDirectory, TList
+from ROOT import TFile, TH1, TH2, TH3, TH1K, TDirectory, TList, TProfile, TClass
+from ROOT import TArrayD, TArrayF, TArrayI, TArrayS, TArrayC
 
-from fast_plotting.data import DataAnnotations
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.profiling import profiled, ProfileStage
 from fast_plotting.logger import get_logger
 
 ROOT_LOGGER = get_logger("ROOTSources")
 
-def convert_to_numpy(histogram):
-    """Convert to the numpy format we are using
+# converting histograms takes time, hence cache the result
+CACHEABLE = True
+
+# maximum number of ROOT files kept open at the same time
+MAX_OPEN_FILES = 32
+# open ROOT files, least recently used first
+ROOT_FILES = OrderedDict()
+# per file, paths of directories and lists mapped to the objects and entries of lists by name, see get_object
+NAME_INDEX = {}
+
+# layout of uncertainties as returned by convert_to_numpy, see fast_plotting.data.DataWrapper
+ERROR_LAYOUT = {"symmetric": True, "error_axes": (1,)}
+
+# kinds of objects distinguished when scanning a file
+KIND_OTHER = 0
+KIND_HISTOGRAM = 1
+KIND_DIRECTORY = 2
+KIND_LIST = 3
+# class names mapped to their kind, filled while scanning
+CLASS_KINDS = {}
+
+# map ROOT array base classes of histograms to the numpy type of their buffer
+ARRAY_TYPES = ((TArrayD, np.float64), (TArrayF, np.float32), (TArrayI, np.int32), (TArrayS, np.int16), (TArrayC, np.int8))
+
+def buffer_to_numpy(buffer, size, dtype=np.float64):
+    """Wrap a raw ROOT buffer as numpy array without copying
 
-    Right now only handle TH1<type>
+    Args:
+        buffer: low-level view as returned by e.g. TArray::GetArray
+        size: int
+            number of elements in the buffer
+        dtype: numpy type
+            type of buffer elements
     """
-    if isinstance(histogram, TH1) and isinstance(histogram, (TH2, TH3)):
-        ROOT_LOGGER.critical("At the moment can only handle TH1.")
+    buffer.reshape((size,))
+    return np.frombuffer(buffer, dtype=dtype, count=size)
+
+def get_bin_centers(axis):
+    """Get all bin centers of an axis at once"""
+    n_bins = axis.GetNbins()
+    edges = axis.GetXbins()
+    if edges.GetSize():
+        # variable bin widths
+        edges = buffer_to_numpy(edges.GetArray(), n_bins + 1)
+    else:
+        edges = np.linspace(axis.GetXmin(), axis.GetXmax(), n_bins + 1)
+    return 0.5 * (edges[:-1] + edges[1:])
+
+def make_buffer(n_bins, dtype=np.float64):
+    """Make one buffer holding bin centers, contents and errors
+
+    Returns:
+        numpy.ndarray, numpy.ndarray: views for data and uncertainties
+    """
+    buffer = np.empty((n_bins, 3), dtype=dtype)
+    return buffer[:,:2], buffer[:,2:]
 
+def convert_to_numpy_loop(histogram, dtype=np.float64):
+    """Convert bin by bin
+
+    Used as fallback for all histograms where bin contents and errors do not correspond to the raw buffers
+    """
     n_bins = histogram.GetNbinsX()
-    data = np.full((n_bins, 2), 0.)
-    uncertainties = np.full((n_bins, 2, 2), 0.)
+    data, uncertainties = make_buffer(n_bins, dtype)
 
     axis = histogram.GetXaxis()
     for i in range(1, n_bins + 1):
         data[i-1][:] = [axis.GetBinCenter(i), histogram.GetBinContent(i)]
-        uncertainties[i-1][1][:] = [histogram.GetBinError(i), histogram.GetBinError(i)]
+        uncertainties[i-1][0] = histogram.GetBinError(i)
+
+    return data, uncertainties
+
+@profiled("convert_to_numpy")
+def convert_to_numpy(histogram, dtype=np.float64):
+    """Convert to the numpy format we are using
+
+    Right now only handle TH1<type>. Bin contents and errors are taken from the histogram's
+    internal buffers at once instead of querying bin by bin.
+    Data and uncertainties are views of one buffer, uncertainties are only stored for the y-axis
+    and are symmetric, see ERROR_LAYOUT.
+    """
+    if isinstance(histogram, TH1) and isinstance(histogram, (TH2, TH3)):
+        ROOT_LOGGER.critical("At the moment can only handle TH1.")
+
+    buffer_dtype = None
+    for array_type, array_dtype in ARRAY_TYPES:
+        if isinstance(histogram, array_type):
+            buffer_dtype = array_dtype
+            break
+
+    if buffer_dtype is None or isinstance(histogram, (TProfile, TH1K)) or histogram.GetBinErrorOption() != TH1.kNormal:
+        # contents or errors are derived, cannot take them from buffers directly
+        return convert_to_numpy_loop(histogram, dtype)
+
+    # fills might still wait in the fill buffer, bin by bin access does that implicitly
+    histogram.BufferEmpty()
+
+    n_bins = histogram.GetNbinsX()
+    # buffers include under- and overflow bins
+    n_cells = histogram.GetNcells()
+    contents = buffer_to_numpy(histogram.GetArray(), n_cells, buffer_dtype)[1:n_bins + 1]
+    if histogram.GetSumw2N():
+        errors = np.sqrt(buffer_to_numpy(histogram.GetSumw2().GetArray(), n_cells)[1:n_bins + 1])
+    else:
+        # that is what ROOT does if no sum of squared weights is there
+        errors = np.sqrt(np.abs(contents, dtype=np.float64))
+
+    data, uncertainties = make_buffer(n_bins, dtype)
+    data[:,0] = get_bin_centers(histogram.GetXaxis())
+    data[:,1] = contents
+    uncertainties[:,0] = errors
 
     return data, uncertainties
 
-def get_histogram(root_object, root_path_list):
-    """Extract histogram from ROOT object
+def get_child(root_object, name):
+    """Get a direct child of a directory, None if not there"""
+    if not isinstance(root_object, TDirectory):
+        ROOT_LOGGER.critical("Cannot handle ROOT object")
+    return root_object.Get(name)
+
+@profiled("get_object")
+def get_object(filepath, root_path):
+    """Get an object from a ROOT file
+
+    Intermediate directories and lists are looked up only once per file and kept in an index.
+    Hence, reading many objects from the same (deep) hierarchy does not read or scan the same
+    lists again and again.
 
     Args:
-        root_object: should either derived from TDirectory or TList
-            object holding our object of interest, potentially at some deeper level
-        root_path_list: iterable
-            going further down in the hierarchy
+        filepath: str
+            path to ROOT file
+        root_path: str
+            path to the object inside the file
     """
-    next_in_list = root_path_list[0]
-    finished = len(root_path_list) == 1
-    if isinstance(root_object, TDirectory):
-        if finished:
-            h = root_object.Get(next_in_list)
-            if not h:
-                ROOT_LOGGER.critical("Object not found")
-            return h
-        return get_histogram(root_object.Get(next_in_list), root_path_list[1:])
-    if isinstance(root_object, TList):
-        this_list = None
-        for l in root_object:
-            if l.GetName() == next_in_list:
-                this_list = l
-                if finished:
-                    return l
-                break
-        if not this_list:
-            ROOT_LOGGER.critical("Object not found")
-        return get_histogram(this_list, root_path_list[1:])
-    ROOT_LOGGER.critical("Cannot handle ROOT object")
+    f = open_file(filepath)
+    index = NAME_INDEX.setdefault(filepath, {})
+    root_path_list = root_path.split("/")
+
+    # start from the deepest container already known
+    parent, entries = f, None
+    start = 0
+    for i in range(len(root_path_list) - 1, 0, -1):
+        indexed = index.get("/".join(root_path_list[:i]))
+        if indexed is not None:
+            parent, entries = indexed
+            start = i
+            break
+
+    for i in range(start, len(root_path_list)):
+        name = root_path_list[i]
+        root_object = entries.get(name) if entries is not None else get_child(parent, name)
+        if not root_object:
+            ROOT_LOGGER.critical("Object %s not found in file %s", "/".join(root_path_list[:i + 1]), filepath)
+        if i == len(root_path_list) - 1:
+            return root_object
+        entries = None
+        if isinstance(root_object, TList):
+            # index entries by name once, the first one wins in case of duplicate names
+            entries = {}
+            for l in root_object:
+                entries.setdefault(l.GetName(), l)
+        # the list is kept alive together with its entries
+        index["/".join(root_path_list[:i + 1])] = (root_object, entries)
+        parent = root_object
     return None
 
-def read(filepath, histogram_path):
+def open_file(filepath):
+    """Get an open ROOT file
+
+    Files are opened only once and kept open for subsequent reads.
+    If more than MAX_OPEN_FILES are open, the least recently used one is closed.
+    """
+    if filepath in ROOT_FILES:
+        ROOT_FILES.move_to_end(filepath)
+        return ROOT_FILES[filepath]
+
+    with ProfileStage("TFile.Open"):
+        f = TFile.Open(filepath, "READ")
+    if not f or f.IsZombie():
+        ROOT_LOGGER.critical("Cannot open ROOT file %s", filepath)
+    ROOT_FILES[filepath] = f
+
+    while len(ROOT_FILES) > MAX_OPEN_FILES:
+        filepath_close, f_close = ROOT_FILES.popitem(last=False)
+        NAME_INDEX.pop(filepath_close, None)
+        f_close.Close()
+
+    return f
+
+def close_files():
+    """Close all ROOT files that are still open"""
+    NAME_INDEX.clear()
+    while ROOT_FILES:
+        _, f = ROOT_FILES.popitem()
+        f.Close()
+
+def read_histogram(filepath, histogram_path, dtype=np.float64):
     """Get a histogram from ROOT source
 
     Right now only from ROOT file
     """
 
-    f = TFile.Open(filepath, "READ")
-
-    histogram_path_list = histogram_path.split("/")
-    histogram = get_histogram(f, histogram_path_list)
+    histogram = get_object(filepath, histogram_path)
 
     if not histogram:
         ROOT_LOGGER.critical("Failed to load histogram %s from file %s.", histogram_path, filepath)
@@ -83,9 +229,52 @@ def read(filepath, histogram_path):
     data_annotations = DataAnnotations(axis_labels=axis_labels)
 
     # convert to numpy and return together with annotations
-    data, uncertainties = convert_to_numpy(histogram)
+    data, uncertainties = convert_to_numpy(histogram, dtype)
     return data, uncertainties, data_annotations
 
+def read(batch):
+    """Get the DataWrapper described by a source batch
+
+    Args:
+        batch: dict
+            source batch with "filepath" and "rootpath" to the histogram inside the file
+    """
+    if "filepath" not in batch or "rootpath" not in batch:
+        ROOT_LOGGER.critical("Need filepath and path to object inside ROOT file")
+    # sources can request a different type to store data with, e.g. float32
+    dtype = np.dtype(batch.get("dtype", "float64"))
+    data, uncertainties, data_annotations = read_histogram(batch["filepath"], batch["rootpath"], dtype)
+    return DataWrapper(batch["identifier"], data, data_annotations=data_annotations, uncertainties=uncertainties, **ERROR_LAYOUT)
+
+def read_many(batches):
+    """Get DataWrapper objects of several source batches
+
+    Batches are read file by file so that files are opened and their hierarchy is indexed once
+    """
+    order = sorted(range(len(batches)), key=lambda i: batches[i].get("filepath", ""))
+    data_wrappers = [None] * len(batches)
+    for i in order:
+        data_wrappers[i] = read(batches[i])
+    return data_wrappers
+
+def get_class_kind(class_name):
+    """Find out what kind of object a class describes without having an instance of it"""
+    kind = CLASS_KINDS.get(class_name)
+    if kind is not None:
+        return kind
+    root_class = TClass.GetClass(class_name)
+    kind = KIND_OTHER
+    if not root_class:
+        pass
+    elif root_class.InheritsFrom("TDirectory"):
+        kind = KIND_DIRECTORY
+    elif root_class.InheritsFrom("TList"):
+        kind = KIND_LIST
+    elif root_class.InheritsFrom("TH1") and not root_class.InheritsFrom("TH2") and not root_class.InheritsFrom("TH3"):
+        kind = KIND_HISTOGRAM
+    CLASS_KINDS[class_name] = kind
+    return kind
+
 def extract_impl(root_object, current_path, collect, skip_this_name=False):
     if not skip_this_name:
         current_path += f"/{root_object.GetName()}"
@@ -93,13 +282,27 @@ def extract_impl(root_object, current_path, collect, skip_this_name=False):
         # Collect only what we can handle at the moment
         collect.append(current_path[1:])
     if isinstance(root_object, TDirectory):
+        seen = set()
         for k in root_object.GetListOfKeys():
-            extract_impl(k.ReadObj(), current_path, collect)
+            name = k.GetName()
+            if name in seen:
+                # keys are sorted by cycle, only the latest one is of interest
+                continue
+            seen.add(name)
+            # decide based on meta data, only read what needs to be looked into
+            kind = get_class_kind(k.GetClassName())
+            if kind == KIND_HISTOGRAM:
+                collect.append(f"{current_path}/{name}"[1:])
+            elif kind == KIND_DIRECTORY:
+                extract_impl(root_object.GetDirectory(name), current_path, collect)
+            elif kind == KIND_LIST:
+                # the content of a list is only known after reading it
+                extract_impl(k.ReadObj(), current_path, collect)
     if isinstance(root_object, TList):
         for l in root_object:
             extract_impl(l, current_path, collect)
 
-def extract_from_source(filepath):
+def discover(filepath):
     """get everything out of a potential ROOT file"""
     f = TFile.Open(filepath, "READ")
     if not f:
@@ -108,6 +311,7 @@ def extract_from_source(filepath):
     collect = []
 
     extract_impl(f, "", collect, True)
+    f.Close()
 
     batches = []
     for i, c in enumerate(collect):
@@ -0,0 +1,145 @@
+"""Memory-mapped store for all data of a configuration
+
+All arrays are written into one binary file which is memory-mapped when read back. Hence,
+data is not copied to the Python heap and several processes share the same pages through the
+OS page cache. The file layout is
+
+    magic (8 bytes) | offset of index (8 bytes) | aligned arrays ... | index (JSON)
+
+where the index maps each identifier to offset, shape and type of its arrays plus annotations.
+"""
+
+from os import replace
+from os.path import isfile, expanduser
+from hashlib import sha1
+import json
+import struct
+
+import numpy as np
+
+from fast_plotting.data import DataWrapper, DataAnnotations
+from fast_plotting.io import file_stamp
+from fast_plotting.registry import iter_loaded, count_references
+from fast_plotting.logger import get_logger
+
+STORE_LOGGER = get_logger("Store")
+
+STORE_MAGIC = b"FPSTORE1"
+# offset of the first array
+STORE_HEADER_SIZE = 16
+# arrays are aligned to this number of bytes
+STORE_ALIGNMENT = 64
+
+
+def store_key(sources):
+    """Fingerprint of source batches and the state of their files"""
+    to_hash = [(s, file_stamp(s["filepath"]) if "filepath" in s else None) for s in sources]
+    return sha1(json.dumps(to_hash, sort_keys=True).encode()).hexdigest()
+
+def write_array(f, array):
+    """Write an array at the next aligned position
+
+    Returns:
+        dict: offset, shape and type of the array
+    """
+    offset = f.tell()
+    padding = -offset % STORE_ALIGNMENT
+    f.write(b"\0" * padding)
+    offset += padding
+    array = np.ascontiguousarray(array)
+    f.write(array.tobytes())
+    return {"offset": offset, "shape": array.shape, "dtype": array.dtype.str}
+
+def write_store(path, data_wrappers, key=None):
+    """Write DataWrapper objects into a store
+
+    Args:
+        path: str
+            where to write the store
+        data_wrappers: iterable
+            DataWrapper objects, can be a generator so that not all of them need to be in memory
+        key: str (optional)
+            to identify what the store was made from
+    """
+    path = expanduser(path)
+    tmp_path = f"{path}.tmp"
+    entries = {}
+    with open(tmp_path, "wb") as f:
+        f.write(STORE_MAGIC)
+        f.write(struct.pack("<Q", 0))
+        for data_wrapper in data_wrappers:
+            entries[data_wrapper.name] = {"data": write_array(f, data_wrapper.data),
+                                          "errors": write_array(f, data_wrapper.errors) if data_wrapper.errors is not None else None,
+                                          "symmetric": data_wrapper.symmetric,
+                                          "error_axes": data_wrapper.error_axes,
+                                          "annotations": data_wrapper.data_annotations.to_dict()}
+        index_offset = f.tell()
+        f.write(json.dumps({"key": key, "entries": entries}).encode())
+        f.seek(len(STORE_MAGIC))
+        f.write(struct.pack("<Q", index_offset))
+    # only now it is a valid store
+    replace(tmp_path, path)
+    STORE_LOGGER.info("Written %d objects to store %s", len(entries), path)
+
+class DataStore:
+    """Read-only access to a store"""
+
+    def __init__(self, path):
+        """init
+
+        Args:
+            path: str
+                path to the store file
+        """
+        self.path = expanduser(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                STORE_LOGGER.critical("%s is not a valid store", self.path)
+            index_offset = struct.unpack("<Q", f.read(8))[0]
+            f.seek(index_offset)
+            index = json.loads(f.read().decode())
+        self.key = index["key"]
+        self.entries = index["entries"]
+        self.buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+    def __contains__(self, identifier):
+        return identifier in self.entries
+
+    def view(self, array_info):
+        """Zero-copy view of an array in the store"""
+        dtype = np.dtype(array_info["dtype"])
+        shape = tuple(array_info["shape"])
+        offset = array_info["offset"]
+        n_bytes = int(np.prod(shape)) * dtype.itemsize
+        return self.buffer[offset:offset + n_bytes].view(dtype).reshape(shape)
+
+    def get(self, identifier):
+        """Get a DataWrapper whose arrays are views of the store"""
+        entry = self.entries[identifier]
+        errors = self.view(entry["errors"]) if entry["errors"] else None
+        return DataWrapper(identifier, self.view(entry["data"]), uncertainties=errors, symmetric=entry["symmetric"],
+                           error_axes=entry["error_axes"], data_annotations=DataAnnotations(**entry["annotations"]))
+
+def make_store(config, path):
+    """Materialise all data needed by enabled plots into a store
+
+    If there is already an up-to-date store at path, it is used as it is. Sources are loaded
+    one at a time and released after they have been written.
+
+    Returns:
+        DataStore: the store
+    """
+    needed = count_references(b for b in config.get_plots() if b["enable"])
+    sources = [config.get_source(identifier) for identifier in needed]
+    sources = sorted((s for s in sources if s is not None), key=lambda s: s.get("filepath", ""))
+    key = store_key(sources)
+
+    if isfile(expanduser(path)):
+        store = DataStore(path)
+        if store.key == key:
+            STORE_LOGGER.info("Using existing store %s", path)
+            return store
+        STORE_LOGGER.info("Store %s is outdated, write it again", path)
+
+    write_store(path, iter_loaded(sources), key)
+    return DataStore(path)
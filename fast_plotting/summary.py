@@ -0,0 +1,90 @@
+"""Summaries of many plots
+
+Instead of putting all plots into one giant figure, a summary can be split into pages of a fixed
+number of plots each. Pages are batches on their own, so they are plotted like any other batch,
+e.g. in parallel. Alternatively, a gallery of small thumbnails is written together with an HTML
+index linking to those full plots which exist.
+"""
+
+from html import escape
+from os.path import join, dirname, basename, splitext, isfile
+
+SUMMARY_NAME = "summary"
+# where thumbnails are put relative to the output directory
+THUMBNAIL_DIR = "thumbnails"
+GALLERY_INDEX = "index.html"
+# the default figures of 30 inches become 300 pixels wide
+THUMBNAIL_DPI = 10
+
+
+def make_page_batches(batches, page_size, output_format="png"):
+    """Split batches into summary pages
+
+    Args:
+        batches: list
+            plot batches
+        page_size: int
+            maximum number of plots per page
+        output_format: str
+            file format of the pages
+    Returns:
+        list: page batches holding their plot batches under "page" and all objects of those
+    """
+    n_pages = (len(batches) + page_size - 1) // page_size
+    width = len(str(n_pages - 1))
+    pages = []
+    for i in range(n_pages):
+        page = batches[i * page_size:(i + 1) * page_size]
+        pages.append({"identifier": f"{SUMMARY_NAME}_{i:0{width}d}",
+                      "objects": [o for b in page for o in b["objects"]],
+                      "page": page,
+                      # all pages have the same grid, also the last one
+                      "page_size": page_size,
+                      "output": f"{SUMMARY_NAME}_{i:0{width}d}.{output_format}"})
+    return pages
+
+def make_thumbnail_batches(batches, engine):
+    """Plot batches rendering a thumbnail of each batch
+
+    Args:
+        batches: list
+            plot batches
+        engine: str
+            render engine of the thumbnails
+    """
+    width = len(str(len(batches) - 1))
+    thumbnails = []
+    for i, b in enumerate(batches):
+        # outputs in different directories can have the same name
+        name = f"{i:0{width}d}_{splitext(basename(b['output']))[0]}"
+        thumbnails.append({**b, "engine": engine, "dpi": THUMBNAIL_DPI, "output": join(THUMBNAIL_DIR, f"{name}.png")})
+    return thumbnails
+
+def write_gallery(filepath, batches, thumbnails):
+    """Write an HTML page showing thumbnails which link to the full plots
+
+    Only thumbnails whose full plot exists next to the page are linked, full plots are written
+    by plotting without summary into the same directory.
+
+    Args:
+        filepath: str
+            where to write the page to, paths of plots and thumbnails are relative to its directory
+        batches: list
+            plot batches
+        thumbnails: list
+            thumbnail batches in the same order
+    """
+    out_dir = dirname(filepath)
+    items = []
+    for b, t in zip(batches, thumbnails):
+        title = escape(b.get("title") or b["identifier"])
+        item = f"<figure><img src=\"{escape(t['output'])}\" loading=\"lazy\" alt=\"{title}\"><figcaption>{title}</figcaption></figure>"
+        if isfile(join(out_dir, b["output"])):
+            item = f"<a href=\"{escape(b['output'])}\">{item}</a>"
+        items.append(item)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Summary</title>\n"
+                "<style>body{display:flex;flex-wrap:wrap}figure{width:300px;margin:4px}img{width:100%}</style>\n"
+                "</head>\n<body>\n")
+        f.write("\n".join(items))
+        f.write("\n</body>\n</html>\n")